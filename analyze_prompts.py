@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Token budget analysis and compaction of agent instructions.
+Token counts use a local approximation (about 4 characters per token for words,
+one token per punctuation mark), which is close enough to compare configs and
+measure savings without calling a model.
+
+Commands:
+    report      token budget per agent config and golden prompt
+    duplicates  phrases repeated within or across the fleet's configs
+    compact     rule-based compaction with before/after token counts
+    stage       snapshot a pending candidate into a test alias (the DRAFT is restored afterwards)
+    regress     run golden prompts against a deployed alias and save pass/fail results,
+                with a hash of the instruction the alias serves
+    gate        approve a compacted instruction only if regression results are unchanged
+"""
+
+import argparse
+import glob
+import hashlib
+import importlib.util
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+
+GOLDEN_PROMPTS_FILE = 'golden_prompts.json'
+COMPACTED_FILE = 'compacted_instructions.json'
+USAGE_DB = 'agent_usage.db'
+CONFIG_PATTERNS = ['*_config.py', '*/agent_config.py']
+SHINGLE_SIZE = 5
+
+# (pattern, replacement) applied in order; each keeps the meaning of the instruction
+COMPACTION_RULES = [
+    (r'[ \t]+\n', '\n'),
+    (r'\n{3,}', '\n\n'),
+    (r'(?<=\S)[ \t]{2,}', ' '),
+    (r'\bin order to\b', 'to'),
+    (r'\b(?:please|kindly)\s+', ''),
+    (r'\b(?:very|really|basically|actually|simply)\s+', ''),
+    (r'\bare able to\b', 'can'),
+    (r'\bmake sure (?:that )?', 'ensure '),
+    (r'\bsuch as\b', 'e.g.'),
+    (r',? and more\b', ''),
+    (r'\bfrom various\b', 'from'),
+    (r'\bYou help users (\w+)', r'You \1'),
+    (r'\bdetailed, (structured|accurate)\b', r'\1'),
+]
+
+_TOKEN_RE = re.compile(r'[A-Za-z]+|\d+|[^\sA-Za-z\d]|\n')
+
+def count_tokens(text):
+    """Approximate token count of text."""
+    total = 0
+    for piece in _TOKEN_RE.findall(text):
+        if piece[0].isalpha():
+            total += max(1, math.ceil(len(piece) / 4))
+        elif piece[0].isdigit():
+            total += math.ceil(len(piece) / 3)
+        else:
+            total += 1
+    return total
+
+def load_configs():
+    """Load AGENT_CONFIG from every config module in the tree, keyed by file path."""
+    configs = {}
+    for pattern in CONFIG_PATTERNS:
+        for path in sorted(glob.glob(pattern)):
+            name = 'config_' + hashlib.sha1(path.encode('utf-8')).hexdigest()[:8]
+            spec = importlib.util.spec_from_file_location(name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            if hasattr(module, 'AGENT_CONFIG'):
+                configs[path] = module.AGENT_CONFIG
+    return configs
+
+def instruction_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def load_golden_prompts():
+    try:
+        with open(GOLDEN_PROMPTS_FILE, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def average_steps():
+    """Average orchestration steps per invocation from usage_tracker's store, if any."""
+    if not os.path.exists(USAGE_DB):
+        return None
+    conn = sqlite3.connect(USAGE_DB)
+    try:
+        steps, calls = conn.execute('SELECT SUM(orchestration_steps), SUM(invocations) FROM usage').fetchone()
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+    if not calls or not steps:
+        return None
+    return steps / calls
+
+def report():
+    """Print the token budget of each config."""
+    configs = load_configs()
+    golden = load_golden_prompts()
+    steps = average_steps()
+
+    print("=" * 60)
+    print("Instruction Token Budget")
+    print("=" * 60)
+    if steps:
+        print(f"Average orchestration steps per invocation (from {USAGE_DB}): {steps:.1f}")
+
+    for path, config in configs.items():
+        instruction_tokens = count_tokens(config['instruction'])
+        prompts = golden.get(config['agent_name'], [])
+        prompt_tokens = [count_tokens(p['prompt']) for p in prompts]
+
+        print(f"\n{path} ({config['agent_name']})")
+        print(f"   Instruction: {instruction_tokens} tokens, {len(config['instruction'])} chars")
+        print(f"   Description: {count_tokens(config['description'])} tokens")
+        if prompt_tokens:
+            print(f"   Golden prompts: {len(prompts)}, avg {sum(prompt_tokens) / len(prompt_tokens):.0f} tokens")
+        per_call = instruction_tokens * (steps or 1)
+        print(f"   Instruction tokens per invocation: ~{per_call:.0f}"
+              + ("" if steps else " (x orchestration steps)"))
+
+def shingles(text):
+    """Word n-grams of a text, keyed by normalized phrase."""
+    words = re.findall(r'[a-z0-9]+', text.lower())
+    return [' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+def duplicates():
+    """Print phrases repeated inside an instruction or shared between configs."""
+    configs = load_configs()
+
+    # Identical instructions (copied configs) are reported once and analyzed as one
+    by_text = {}
+    for path, config in configs.items():
+        by_text.setdefault(config['instruction'], []).append(path)
+
+    seen = {}
+    for text, paths in by_text.items():
+        for phrase in shingles(text):
+            seen.setdefault(phrase, []).append(paths[0])
+
+    print("=" * 60)
+    print(f"Repeated {SHINGLE_SIZE}-word phrases")
+    print("=" * 60)
+
+    for paths in by_text.values():
+        if len(paths) > 1:
+            print(f"Identical instruction in: {', '.join(paths)}")
+
+    repeated = {phrase: paths for phrase, paths in seen.items() if len(paths) > 1}
+    if not repeated:
+        print("✓ No repeated phrases found")
+        return
+
+    for phrase, paths in sorted(repeated.items(), key=lambda item: (-len(item[1]), item[0])):
+        unique = sorted(set(paths))
+        where = 'within ' + unique[0] if len(unique) == 1 else 'across ' + ', '.join(unique)
+        print(f"   '{phrase}' x{len(paths)} {where}")
+
+def compact_text(text):
+    """Apply compaction rules and drop repeated lines."""
+    result = text
+    for pattern, replacement in COMPACTION_RULES:
+        result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
+
+    lines = []
+    seen = set()
+    for line in result.split('\n'):
+        key = re.sub(r'\s+', ' ', line.strip().lower())
+        if key and key in seen:
+            continue
+        seen.add(key)
+        lines.append(line.rstrip())
+    return '\n'.join(lines).strip()
+
+def load_compacted():
+    try:
+        with open(COMPACTED_FILE, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_compacted(data):
+    with open(COMPACTED_FILE, 'w') as f:
+        json.dump(data, f, indent=2)
+
+def compact():
+    """Compact every instruction and store the candidates as pending."""
+    configs = load_configs()
+    compacted = load_compacted()
+
+    print("=" * 60)
+    print("Instruction Compaction")
+    print("=" * 60)
+
+    for path, config in configs.items():
+        original = config['instruction']
+        candidate = compact_text(original)
+        before = count_tokens(original)
+        after = count_tokens(candidate)
+        saved = before - after
+
+        print(f"\n{path} ({config['agent_name']})")
+        print(f"   Before: {before} tokens  After: {after} tokens  Saved: {saved} ({saved / max(before, 1):.0%})")
+        if candidate == original:
+            continue
+
+        existing = compacted.get(config['agent_name'], {})
+        if existing.get('original') == original and existing.get('instruction') == candidate:
+            print(f"   Candidate unchanged ({existing.get('status')})")
+            continue
+        compacted[config['agent_name']] = {
+            'original': original,
+            'instruction': candidate,
+            'tokens_before': before,
+            'tokens_after': after,
+            'status': 'pending'
+        }
+
+    save_compacted(compacted)
+    print(f"\n✓ Candidates saved to {COMPACTED_FILE} (status: pending)")
+    print("Run 'stage' to deploy a candidate to a test alias, then 'regress' for both aliases and 'gate'.")
+    print("'gate' checks that each alias serves the original or the candidate instruction.")
+
+def set_draft_instruction(bedrock, agent_id, instruction, timeout=300):
+    """Replace the DRAFT instruction and prepare the agent. update_agent needs the other settings resent."""
+    agent = bedrock.get_agent(agentId=agent_id)['agent']
+    params = {
+        'agentId': agent_id,
+        'agentName': agent['agentName'],
+        'agentResourceRoleArn': agent['agentResourceRoleArn'],
+        'foundationModel': agent['foundationModel'],
+        'instruction': instruction
+    }
+    for key in ('description', 'idleSessionTTLInSeconds', 'customerEncryptionKeyArn',
+                'guardrailConfiguration', 'memoryConfiguration', 'promptOverrideConfiguration'):
+        if agent.get(key) is not None:
+            params[key] = agent[key]
+    bedrock.update_agent(**params)
+    bedrock.prepare_agent(agentId=agent_id)
+
+    deadline = time.time() + timeout
+    while True:
+        status = bedrock.get_agent(agentId=agent_id)['agent']['agentStatus']
+        if status == 'PREPARED':
+            return
+        if status == 'FAILED' or time.time() > deadline:
+            raise RuntimeError(f"Agent {agent_id} is {status} after updating its instruction")
+        time.sleep(3)
+
+def stage(agent_name, agent_id):
+    """
+    Put the pending candidate on the DRAFT, snapshot it into a new test alias, then
+    restore the original DRAFT instruction so later releases never pick up an
+    unapproved candidate.
+    """
+    import boto3
+    from agent_config import AWS_REGION
+    from release_agent import wait_for_alias
+
+    entry = load_compacted().get(agent_name)
+    if not entry:
+        print(f"✗ No compacted instruction for {agent_name}. Run 'compact' first.")
+        return
+
+    bedrock = boto3.client('bedrock-agent', region_name=AWS_REGION)
+    if bedrock.get_agent(agentId=agent_id)['agent']['instruction'] != entry['original']:
+        print(f"✗ The DRAFT instruction of {agent_id} is not the one the candidate was compacted from. "
+              f"Run 'compact' again.")
+        return
+
+    alias_id = None
+    try:
+        print(f"Applying the candidate instruction to the DRAFT of {agent_id}...")
+        set_draft_instruction(bedrock, agent_id, entry['instruction'])
+        alias_name = f"compaction-test-{int(time.time())}"
+        alias_id = bedrock.create_agent_alias(agentId=agent_id, agentAliasName=alias_name)['agentAlias']['agentAliasId']
+        wait_for_alias(bedrock, agent_id, alias_id)
+        print(f"✓ Test alias {alias_name} ({alias_id}) serves the candidate instruction")
+    except Exception as e:
+        print(f"✗ Error staging candidate: {e}")
+    finally:
+        print("Restoring the original DRAFT instruction...")
+        try:
+            set_draft_instruction(bedrock, agent_id, entry['original'])
+            print("✓ DRAFT restored")
+        except Exception as e:
+            print(f"✗ Could not restore the DRAFT instruction; fix it before the next release: {e}")
+
+    if alias_id:
+        print("\nNext:")
+        print(f"   python analyze_prompts.py regress --agent-name {agent_name} --agent-id {agent_id} "
+              f"--alias-id <production alias id> --output baseline.json")
+        print(f"   python analyze_prompts.py regress --agent-name {agent_name} --agent-id {agent_id} "
+              f"--alias-id {alias_id} --output candidate.json")
+        print(f"   python analyze_prompts.py gate --agent-name {agent_name} "
+              f"--baseline baseline.json --candidate candidate.json")
+        print(f"   aws bedrock-agent delete-agent-alias --agent-id {agent_id} --agent-alias-id {alias_id}")
+
+def served_instruction(bedrock, agent_id, alias_id):
+    """Instruction of the agent version an alias routes to."""
+    alias = bedrock.get_agent_alias(agentId=agent_id, agentAliasId=alias_id)['agentAlias']
+    version = alias['routingConfiguration'][0]['agentVersion']
+    if version == 'DRAFT':
+        return bedrock.get_agent(agentId=agent_id)['agent']['instruction']
+    return bedrock.get_agent_version(agentId=agent_id, agentVersion=version)['agentVersion']['instruction']
+
+def regress(agent_name, agent_id, alias_id, output):
+    """Run the golden prompts against an alias and write pass/fail per prompt."""
+    import boto3
+    from agent_config import AWS_REGION
+
+    prompts = load_golden_prompts().get(agent_name, [])
+    if not prompts:
+        print(f"✗ No golden prompts for {agent_name} in {GOLDEN_PROMPTS_FILE}")
+        return
+
+    bedrock = boto3.client('bedrock-agent', region_name=AWS_REGION)
+    try:
+        served_hash = instruction_hash(served_instruction(bedrock, agent_id, alias_id))
+    except Exception as e:
+        print(f"✗ Error reading the instruction served by {alias_id}: {e}")
+        return
+
+    runtime = boto3.client('bedrock-agent-runtime', region_name=AWS_REGION)
+    results = {}
+    for case in prompts:
+        try:
+            response = runtime.invoke_agent(
+                agentId=agent_id,
+                agentAliasId=alias_id,
+                sessionId=f"regress-{int(time.time() * 1000)}",
+                inputText=case['prompt']
+            )
+            text = ''.join(
+                event['chunk']['bytes'].decode('utf-8')
+                for event in response['completion'] if 'chunk' in event
+            )
+            missing = [word for word in case['expect'] if word.lower() not in text.lower()]
+        except Exception as e:
+            missing = [f"error: {e}"]
+        results[case['prompt']] = {'passed': not missing, 'missing': missing}
+        print(f"   {'✓' if not missing else '✗'} {case['prompt'][:60]}")
+
+    with open(output, 'w') as f:
+        json.dump({'agent_name': agent_name, 'alias_id': alias_id, 'instruction_sha256': served_hash,
+                   'results': results}, f, indent=2)
+    print(f"\n✓ Results saved to {output}")
+
+def gate_problems(agent_name, entry, baseline, candidate):
+    """Reasons the two result files cannot be used to judge the entry's candidate."""
+    problems = []
+    expected = {
+        'baseline': (baseline, entry['original'], 'original'),
+        'candidate': (candidate, entry['instruction'], 'compacted')
+    }
+    golden = [case['prompt'] for case in load_golden_prompts().get(agent_name, [])]
+    if not golden:
+        problems.append(f"no golden prompts for {agent_name} in {GOLDEN_PROMPTS_FILE}")
+
+    for label, (document, instruction, kind) in expected.items():
+        if document.get('agent_name') != agent_name:
+            problems.append(f"{label} results are for {document.get('agent_name')}, not {agent_name}")
+        if document.get('instruction_sha256') != instruction_hash(instruction):
+            problems.append(f"{label} alias {document.get('alias_id')} does not serve the {kind} instruction")
+        missing = [prompt for prompt in golden if prompt not in document.get('results', {})]
+        if missing:
+            problems.append(f"{label} results miss {len(missing)} golden prompt(s)")
+    return problems
+
+def gate(agent_name, baseline_path, candidate_path):
+    """Approve the pending candidate only if every golden prompt has the same outcome."""
+    with open(baseline_path, 'r') as f:
+        baseline_document = json.load(f)
+    with open(candidate_path, 'r') as f:
+        candidate_document = json.load(f)
+
+    compacted = load_compacted()
+    entry = compacted.get(agent_name)
+    if not entry:
+        print(f"✗ No compacted instruction for {agent_name}. Run 'compact' first.")
+        return
+
+    problems = gate_problems(agent_name, entry, baseline_document, candidate_document)
+    if problems:
+        for problem in problems:
+            print(f"   ✗ {problem}")
+        print(f"\n✗ Cannot gate {agent_name}; status left as {entry['status']}")
+        return
+
+    baseline = baseline_document['results']
+    candidate = candidate_document['results']
+    changed = [
+        case['prompt'] for case in load_golden_prompts()[agent_name]
+        if candidate[case['prompt']]['passed'] != baseline[case['prompt']]['passed']
+    ]
+
+    if changed:
+        entry['status'] = 'rejected'
+        for prompt in changed:
+            print(f"   ✗ Result changed: {prompt[:60]}")
+        print(f"\n✗ Compacted instruction for {agent_name} rejected")
+    else:
+        entry['status'] = 'approved'
+        print(f"✓ Regression results unchanged; compacted instruction for {agent_name} approved "
+              f"({entry['tokens_before']} -> {entry['tokens_after']} tokens)")
+    save_compacted(compacted)
+
+def approved_instruction(agent_config):
+    """Return the approved compacted instruction for a config, or its original instruction."""
+    entry = load_compacted().get(agent_config['agent_name'])
+    if entry and entry.get('status') == 'approved' and entry.get('original') == agent_config['instruction']:
+        return entry['instruction']
+    return agent_config['instruction']
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze and compact agent instructions.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('report', help='Token budget per agent')
+    subparsers.add_parser('duplicates', help='Repeated phrases across configs')
+    subparsers.add_parser('compact', help='Create compacted instruction candidates')
+
+    stage_parser = subparsers.add_parser('stage', help='Create a test alias serving the pending candidate')
+    stage_parser.add_argument('--agent-name', required=True)
+    stage_parser.add_argument('--agent-id', required=True)
+
+    regress_parser = subparsers.add_parser('regress', help='Run golden prompts against an alias')
+    regress_parser.add_argument('--agent-name', required=True)
+    regress_parser.add_argument('--agent-id', required=True)
+    regress_parser.add_argument('--alias-id', required=True)
+    regress_parser.add_argument('--output', required=True)
+
+    gate_parser = subparsers.add_parser('gate', help='Approve a candidate if results are unchanged')
+    gate_parser.add_argument('--agent-name', required=True)
+    gate_parser.add_argument('--baseline', required=True)
+    gate_parser.add_argument('--candidate', required=True)
+
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        report()
+    elif args.command == 'duplicates':
+        duplicates()
+    elif args.command == 'compact':
+        compact()
+    elif args.command == 'stage':
+        stage(args.agent_name, args.agent_id)
+    elif args.command == 'regress':
+        regress(args.agent_name, args.agent_id, args.alias_id, args.output)
+    else:
+        gate(args.agent_name, args.baseline, args.candidate)
+
+if __name__ == '__main__':
+    main()
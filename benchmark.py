@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the deploy, invoke, verify and cleanup paths.
+S3 calls go to a local moto server and Bedrock calls to stub clients with
+configurable latency and chunk patterns, so runs need no AWS account and are
+comparable between changes.
+
+Requires: pip install "moto[server]"
+
+    python benchmark.py                      # run everything, save benchmark_results.json
+    python benchmark.py --save-baseline      # store the run as benchmark_baseline.json
+    python benchmark.py --compare            # fail if a metric regressed against the baseline
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = 'benchmark_results.json'
+BASELINE_FILE = 'benchmark_baseline.json'
+STARTUP_MODULES = [
+    'deploy_agent', 'test_agent', 'verify_permissions', 'cleanup',
+    'fleet_status', 'reap_agents', 'tag_resources', 'job_queue'
+]
+# Metrics whose names end with these are better when larger; everything else is a duration
+HIGHER_IS_BETTER = ('throughput', 'per_second')
+
+class StubBedrockAgent:
+    """Stand-in for the bedrock-agent control plane client."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create_agent(self, **kwargs):
+        time.sleep(self.latency)
+        return {'agent': {'agentId': 'STUBAGENT1',
+                          'agentArn': 'arn:aws:bedrock:us-east-1:000000000000:agent/STUBAGENT1'}}
+
+    def prepare_agent(self, **kwargs):
+        time.sleep(self.latency)
+        return {'agentStatus': 'PREPARED'}
+
+    def create_agent_alias(self, **kwargs):
+        time.sleep(self.latency)
+        return {'agentAlias': {'agentAliasId': 'STUBALIAS1'}}
+
+    def list_agents(self, **kwargs):
+        time.sleep(self.latency)
+        return {'agentSummaries': []}
+
+class StubBedrockRuntime:
+    """Stand-in for bedrock-agent-runtime that streams a fixed chunk pattern."""
+
+    def __init__(self, first_chunk_latency, chunks, chunk_bytes, chunk_interval):
+        self.first_chunk_latency = first_chunk_latency
+        self.chunks = chunks
+        self.chunk_bytes = chunk_bytes
+        self.chunk_interval = chunk_interval
+
+    def invoke_agent(self, **kwargs):
+        def stream():
+            yield {'trace': {'trace': {'orchestrationTrace': {'modelInvocationOutput': {
+                'traceId': 'stub-0', 'metadata': {'usage': {'inputTokens': 500, 'outputTokens': 100}}}}}}}
+            time.sleep(self.first_chunk_latency)
+            for i in range(self.chunks):
+                if i and self.chunk_interval:
+                    time.sleep(self.chunk_interval)
+                yield {'chunk': {'bytes': b'x' * self.chunk_bytes}}
+
+        return {'completion': stream()}
+
+@contextlib.contextmanager
+def patched_clients(stubs, s3_endpoint=None):
+    """Route boto3.client() to stubs (by service name) and S3 to the local endpoint."""
+    original = boto3.client
+
+    def client(service, *args, **kwargs):
+        if service in stubs:
+            return stubs[service]
+        if service == 's3' and s3_endpoint:
+            kwargs.update(endpoint_url=s3_endpoint, aws_access_key_id='testing', aws_secret_access_key='testing')
+        return original(service, *args, **kwargs)
+
+    boto3.client = client
+    try:
+        yield
+    finally:
+        boto3.client = original
+
+@contextlib.contextmanager
+def first_output_timer(module):
+    """Per thread, time from start() to the first streamed text the module prints (print(..., end=''))."""
+    state = threading.local()
+    lock = threading.Lock()
+    samples = []
+
+    def start():
+        state.started = time.perf_counter()
+
+    def timed_print(*args, **kwargs):
+        started = getattr(state, 'started', None)
+        if started is not None and kwargs.get('end') == '':
+            with lock:
+                samples.append(time.perf_counter() - started)
+            state.started = None
+        print(*args, **kwargs)
+
+    module.print = timed_print
+    try:
+        yield start, samples
+    finally:
+        del module.print
+
+@contextlib.contextmanager
+def quiet_workdir():
+    """Run in a scratch directory with stdout suppressed (scripts print and write local files)."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield scratch
+        finally:
+            os.chdir(cwd)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def bench_deploy(args):
+    """End-to-end deploy_agent.main() time against the stub control plane."""
+    import deploy_agent
+
+    stub = StubBedrockAgent(args.api_latency)
+    runs = []
+    with patched_clients({'bedrock-agent': stub}), quiet_workdir():
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            deploy_agent.main()
+            runs.append(time.perf_counter() - started)
+    return {'deploy.seconds': statistics.median(runs)}
+
+def bench_verify(args):
+    """verify_permissions Bedrock check against the stub control plane."""
+    import verify_permissions
+
+    stub = StubBedrockAgent(args.api_latency)
+    runs = []
+    with patched_clients({'bedrock-agent': stub}), quiet_workdir():
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            verify_permissions.check_bedrock_permissions()
+            runs.append(time.perf_counter() - started)
+    return {'verify.bedrock.seconds': statistics.median(runs)}
+
+def bench_invoke(args):
+    """test_agent.invoke_agent throughput and time-to-first-chunk at several concurrency levels."""
+    import test_agent
+
+    results = {}
+    for concurrency in args.concurrency:
+        runtime = StubBedrockRuntime(args.ttft, args.chunks, args.chunk_bytes, args.chunk_interval)
+        calls = concurrency * args.invocations_per_worker
+        # Time to first chunk is taken where the caller sees it, so buffering in invoke_agent shows up
+        with patched_clients({'bedrock-agent-runtime': runtime}), quiet_workdir(), \
+                first_output_timer(test_agent) as (start_timer, ttft):
+
+            def call(_):
+                start_timer()
+                test_agent.invoke_agent('STUBAGENT1', 'STUBALIAS1', 'benchmark prompt')
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(call, range(calls)))
+            elapsed = time.perf_counter() - started
+
+        if len(ttft) < calls:
+            raise RuntimeError(f'only {len(ttft)} of {calls} invocations printed a response')
+        results[f'invoke.c{concurrency}.throughput'] = calls / elapsed
+        results[f'invoke.c{concurrency}.ttft_p50_ms'] = percentile(ttft, 50) * 1000
+        results[f'invoke.c{concurrency}.ttft_p95_ms'] = percentile(ttft, 95) * 1000
+    return results
+
+def load_new_bucket_cleanup():
+    """Import new-s3-existing-ecr/cleanup.py, which holds delete_s3_bucket."""
+    path = os.path.join(HERE, 'new-s3-existing-ecr', 'cleanup.py')
+    spec = importlib.util.spec_from_file_location('new_bucket_cleanup', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def bench_cleanup(args):
+    """delete_s3_bucket throughput on a versioned bucket in a local moto server."""
+    from moto.server import ThreadedMotoServer
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    endpoint = f"http://{host}:{port}"
+    try:
+        s3 = boto3.client('s3', region_name='us-east-1', endpoint_url=endpoint,
+                          aws_access_key_id='testing', aws_secret_access_key='testing')
+        bucket = 'benchmark-cleanup'
+        s3.create_bucket(Bucket=bucket)
+        s3.put_bucket_versioning(Bucket=bucket, VersioningConfiguration={'Status': 'Enabled'})
+
+        # Two versions per key so the listing contains both current and noncurrent versions
+        keys = [f"agents/bench/output/{i:07d}.json" for i in range(args.objects // 2)]
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            for _ in range(2):
+                list(pool.map(lambda key: s3.put_object(Bucket=bucket, Key=key, Body=b'{}'), keys))
+
+        # moto loses its place when the version at the pagination marker has been deleted
+        # (S3 does not), so there one call empties about one page; repeat until the bucket
+        # is gone, bounded by the number of pages.
+        cleanup = load_new_bucket_cleanup()
+        with patched_clients({}, s3_endpoint=endpoint), contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            for _ in range(args.objects // 1000 + 2):
+                if cleanup.delete_s3_bucket(bucket, 'us-east-1'):
+                    break
+            else:
+                raise RuntimeError('delete_s3_bucket did not empty the bucket')
+            elapsed = time.perf_counter() - started
+    finally:
+        server.stop()
+
+    return {
+        'cleanup.seconds': elapsed,
+        'cleanup.objects_per_second': len(keys) * 2 / elapsed
+    }
+
+def bench_startup(args):
+    """Wall time to start Python and import each script module."""
+    results = {}
+    for module in STARTUP_MODULES:
+        runs = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, '-c', f'import {module}'], cwd=HERE, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            runs.append(time.perf_counter() - started)
+        results[f'startup.{module}.ms'] = statistics.median(runs) * 1000
+    return results
+
+BENCHMARKS = {
+    'deploy': bench_deploy,
+    'verify': bench_verify,
+    'invoke': bench_invoke,
+    'cleanup': bench_cleanup,
+    'startup': bench_startup,
+}
+
+def compare(results, baseline, threshold):
+    """Return the metrics that regressed by more than threshold (a fraction) or are missing from results."""
+    regressions = []
+    for name in sorted(set(baseline) - set(results)):
+        print(f"   ✗ {name:<36} {baseline[name]:>12.2f} -> {'missing':>12}")
+        regressions.append(name)
+    for name, value in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            continue
+        change = (value - base) / base
+        if name.endswith(HIGHER_IS_BETTER):
+            change = -change
+        marker = '✗' if change > threshold else '✓'
+        verdict = f"{change:.1%} worse" if change > 0 else f"{-change:.1%} better"
+        print(f"   {marker} {name:<36} {base:>12.2f} -> {value:>12.2f} ({verdict})")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Run offline benchmarks.')
+    parser.add_argument('--only', default=','.join(BENCHMARKS), help='Comma-separated benchmarks to run')
+    parser.add_argument('--quick', action='store_true', help='Smaller workloads for a fast sanity run')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--api-latency', type=float, default=0.05, help='Stub control plane latency (s)')
+    parser.add_argument('--ttft', type=float, default=0.3, help='Stub time to first chunk (s)')
+    parser.add_argument('--chunks', type=int, default=20)
+    parser.add_argument('--chunk-bytes', type=int, default=64)
+    parser.add_argument('--chunk-interval', type=float, default=0.02)
+    parser.add_argument('--concurrency', default='1,4,16')
+    parser.add_argument('--invocations-per-worker', type=int, default=5)
+    parser.add_argument('--objects', type=int, default=100000, help='Object versions for the cleanup benchmark')
+    parser.add_argument('--output', default=RESULTS_FILE)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true', help='Compare against the baseline')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed regression (fraction)')
+    args = parser.parse_args()
+
+    args.concurrency = [int(c) for c in args.concurrency.split(',')]
+    if args.quick:
+        args.repeat = 2
+        args.objects = min(args.objects, 2000)
+        args.invocations_per_worker = 2
+
+    sys.path.insert(0, HERE)
+
+    print("=" * 60)
+    print("Benchmarks")
+    print("=" * 60)
+
+    results = {}
+    failed = []
+    for name in args.only.split(','):
+        print(f"\nRunning {name}...")
+        try:
+            metrics = BENCHMARKS[name](args)
+        except Exception as e:
+            print(f"   ✗ {name} failed: {e}")
+            failed.append(name)
+            continue
+        for metric, value in metrics.items():
+            print(f"   {metric:<36} {value:>12.2f}")
+        results.update(metrics)
+
+    document = {'created_at': time.time(), 'python': sys.version.split()[0], 'metrics': results}
+    with open(args.output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"\n✓ Results saved to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"✓ Baseline saved to {args.baseline}")
+
+    if args.compare:
+        try:
+            with open(args.baseline, 'r') as f:
+                baseline = json.load(f)['metrics']
+        except FileNotFoundError:
+            print(f"✗ No baseline at {args.baseline}. Run with --save-baseline first.")
+            sys.exit(1)
+
+        print(f"\nComparison with {args.baseline} (threshold {args.threshold:.0%}):")
+        only = tuple(f"{name}." for name in args.only.split(','))
+        regressions = compare(results, {k: v for k, v in baseline.items() if k.startswith(only)}, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} metric(s) regressed")
+        elif not failed:
+            print("\n✓ No regressions")
+
+    if failed:
+        print(f"\n✗ {len(failed)} benchmark(s) failed: {', '.join(failed)}")
+    if failed or (args.compare and regressions):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
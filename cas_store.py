@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Content-addressed upload of agent input media.
+Each file is stored once under cas/<sha256> in the shared bucket and agent prefixes
+receive a small manifest pointing at the stored objects.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.exceptions import ClientError
+
+from agent_config import AWS_REGION, SHARED_S3_BUCKET, S3_AGENT_PREFIX
+
+CAS_PREFIX = 'cas'
+INDEX_FILE = '.cas_index.json'
+CHUNK_SIZE = 8 * 1024 * 1024
+
+def split_s3_uri(uri):
+    """Split an s3://bucket/key URI into (bucket, key)."""
+    bucket, _, key = uri[len('s3://'):].partition('/')
+    return bucket, key
+
+def load_index(path=INDEX_FILE):
+    """Load the local hash index."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_index(index, path=INDEX_FILE):
+    """Write the local hash index atomically."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def hash_file(path, index, lock):
+    """
+    Return the sha256 of a file, streaming it in chunks.
+    Files whose (path, size, mtime) match the index are not re-read.
+    """
+    abs_path = os.path.abspath(path)
+    stat = os.stat(abs_path)
+    with lock:
+        cached = index.get(abs_path)
+    if cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime_ns:
+        return cached['sha256'], stat.st_size
+
+    digest = hashlib.sha256()
+    with open(abs_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+
+    sha256 = digest.hexdigest()
+    with lock:
+        index[abs_path] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha256': sha256}
+    return sha256, stat.st_size
+
+def cas_key(sha256):
+    """S3 key for a content hash."""
+    return f"{CAS_PREFIX}/{sha256}"
+
+def object_exists(s3, bucket, key):
+    """HEAD an object; returns False on 404."""
+    try:
+        s3.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+def store_file(s3, bucket, path, sha256):
+    """Upload a file under its content hash unless it already exists. Returns True if uploaded."""
+    key = cas_key(sha256)
+    if object_exists(s3, bucket, key):
+        return False
+    s3.upload_file(path, bucket, key, ExtraArgs={'Metadata': {'sha256': sha256}})
+    return True
+
+def manifest_names(paths):
+    """
+    Manifest keys for the given files: paths relative to their deepest common directory,
+    so files with the same basename in different directories do not collide.
+    """
+    abs_paths = [os.path.abspath(path) for path in paths]
+    root = os.path.commonpath([os.path.dirname(path) for path in abs_paths])
+    return {path: os.path.relpath(abs_path, root).replace(os.sep, '/') for path, abs_path in zip(paths, abs_paths)}
+
+def upload(paths, agent_uri, manifest_name, workers):
+    """Hash and store files, then write the manifest under the agent prefix."""
+    s3 = boto3.client('s3', region_name=AWS_REGION)
+    index = load_index()
+    index_lock = threading.Lock()
+
+    def process(path):
+        sha256, size = hash_file(path, index, index_lock)
+        uploaded = store_file(s3, SHARED_S3_BUCKET, path, sha256)
+        return path, sha256, size, uploaded
+
+    names = manifest_names(paths)
+    entries = {}
+    uploaded_bytes = 0
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for path, sha256, size, uploaded in pool.map(process, paths):
+            entries[names[path]] = {
+                'sha256': sha256,
+                'size': size,
+                'uri': f"s3://{SHARED_S3_BUCKET}/{cas_key(sha256)}"
+            }
+            if uploaded:
+                uploaded_bytes += size
+                print(f"  ↑ {path} -> {cas_key(sha256)}")
+            else:
+                skipped += 1
+                print(f"  = {path} already stored")
+
+    save_index(index)
+
+    bucket, prefix = split_s3_uri(agent_uri)
+    manifest_key = f"{prefix.rstrip('/')}/{manifest_name}"
+    s3.put_object(
+        Bucket=bucket,
+        Key=manifest_key,
+        Body=json.dumps({'files': entries}, indent=2).encode('utf-8'),
+        ContentType='application/json'
+    )
+
+    print(f"\n✓ {len(entries)} file(s): {len(entries) - skipped} uploaded "
+          f"({uploaded_bytes / 1024 / 1024:.1f} MB), {skipped} deduplicated")
+    print(f"  Manifest: s3://{bucket}/{manifest_key}")
+
+def resolve(manifest_uri):
+    """Print the content locations listed in a manifest."""
+    s3 = boto3.client('s3', region_name=AWS_REGION)
+    bucket, key = split_s3_uri(manifest_uri)
+    manifest = json.loads(s3.get_object(Bucket=bucket, Key=key)['Body'].read())
+    for name, entry in sorted(manifest['files'].items()):
+        print(f"{name}\t{entry['uri']}\t{entry['size']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Content-addressed store for agent input media.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    upload_parser = subparsers.add_parser('upload', help='Store files and write a manifest')
+    upload_parser.add_argument('files', nargs='+')
+    upload_parser.add_argument('--prefix', default='images',
+                               help='Sub-prefix under the agent prefix (e.g. images, videos)')
+    upload_parser.add_argument('--agent-prefix', default=S3_AGENT_PREFIX)
+    upload_parser.add_argument('--manifest', default='cas-manifest.json', help='Manifest file name')
+    upload_parser.add_argument('--workers', type=int, default=8)
+
+    resolve_parser = subparsers.add_parser('resolve', help='List the objects a manifest points at')
+    resolve_parser.add_argument('manifest_uri')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'upload':
+            agent_uri = f"{args.agent_prefix.rstrip('/')}/{args.prefix.strip('/')}"
+            print(f"Storing {len(args.files)} file(s) in s3://{SHARED_S3_BUCKET}/{CAS_PREFIX}/")
+            upload(args.files, agent_uri, args.manifest, args.workers)
+        else:
+            resolve(args.manifest_uri)
+    except Exception as e:
+        print(f"✗ Error: {e}")
+
+if __name__ == '__main__':
+    main()
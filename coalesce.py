@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Single-flight coalescing of identical in-flight agent invocations.
+The first caller for an (agent, alias, normalized prompt) key starts invoke_agent;
+callers that arrive while it is streaming subscribe to the same chunks and receive
+them as they arrive, without another model call. Once the stream finishes the key
+is released, so this is not a response cache.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+from agent_config import AWS_REGION
+
+DEFAULT_MAX_BUFFER_BYTES = 1024 * 1024
+
+def normalize_prompt(prompt):
+    """
+    Collapse whitespace so trivially different prompts share a flight. Case is kept:
+    S3 keys and quoted text are case-sensitive, so a case change can be a different request.
+    """
+    return re.sub(r'\s+', ' ', prompt).strip()
+
+class Flight:
+    """One invoke_agent stream shared by several subscribers."""
+
+    def __init__(self, key, max_buffer_bytes):
+        self.key = key
+        self.max_buffer_bytes = max_buffer_bytes
+        self.cond = threading.Condition()
+        self.chunks = []
+        self.base = 0
+        self.buffered_bytes = 0
+        self.cursors = {}
+        self.joinable = True
+        self.done = False
+        self.error = None
+
+    def subscribe(self):
+        """Register a subscriber starting at the first chunk. Returns None if the flight no longer accepts joiners."""
+        with self.cond:
+            if not self.joinable:
+                return None
+            token = object()
+            self.cursors[token] = 0
+            return Subscription(self, token)
+
+    def publish(self, text):
+        """Append a chunk, waiting while slow subscribers hold the buffer at its limit."""
+        size = len(text.encode('utf-8'))
+        with self.cond:
+            while self.cursors and self.buffered_bytes and self.buffered_bytes + size > self.max_buffer_bytes:
+                # Late joiners need the stream from the start; once the buffer is full that is no longer possible
+                self.joinable = False
+                if not self._trim():
+                    self.cond.wait()
+            self.chunks.append(text)
+            self.buffered_bytes += size
+            self.cond.notify_all()
+            if not self.cursors:
+                # The publisher stops reading now; a late joiner would get a truncated stream
+                self.joinable = False
+                return False
+            return True
+
+    def close(self, error=None):
+        with self.cond:
+            self.done = True
+            self.joinable = False
+            self.error = error
+            self.cond.notify_all()
+
+    def _trim(self):
+        """Drop chunks every subscriber has read. Caller holds the lock. Returns True if anything was freed."""
+        if self.joinable or not self.cursors:
+            return False
+        low = min(self.cursors.values())
+        drop = low - self.base
+        if drop <= 0:
+            return False
+        self.buffered_bytes -= sum(len(c.encode('utf-8')) for c in self.chunks[:drop])
+        del self.chunks[:drop]
+        self.base = low
+        return True
+
+    def _next(self, token):
+        """Block until the subscriber's next chunk is available; None at end of stream."""
+        with self.cond:
+            while True:
+                cursor = self.cursors[token]
+                if cursor < self.base + len(self.chunks):
+                    chunk = self.chunks[cursor - self.base]
+                    self.cursors[token] = cursor + 1
+                    if self._trim():
+                        self.cond.notify_all()
+                    return chunk
+                if self.done:
+                    if self.error:
+                        raise self.error
+                    return None
+                self.cond.wait()
+
+    def _leave(self, token):
+        with self.cond:
+            self.cursors.pop(token, None)
+            self._trim()
+            self.cond.notify_all()
+
+class Subscription:
+    """Iterator over the text chunks of a shared flight."""
+
+    def __init__(self, flight, token):
+        self.flight = flight
+        self.token = token
+
+    def __iter__(self):
+        try:
+            while True:
+                chunk = self.flight._next(self.token)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.flight._leave(self.token)
+
+    def text(self):
+        """Consume the whole stream and return the full response."""
+        return ''.join(self)
+
+class InvocationCoalescer:
+    """Shares invoke_agent streams between concurrent identical requests."""
+
+    def __init__(self, client=None, max_buffer_bytes=DEFAULT_MAX_BUFFER_BYTES):
+        self.client = client or boto3.client('bedrock-agent-runtime', region_name=AWS_REGION)
+        self.max_buffer_bytes = max_buffer_bytes
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.invocations = 0
+        self.coalesced = 0
+
+    def invoke(self, agent_id, alias_id, prompt):
+        """Return a Subscription streaming the response for prompt."""
+        key = (agent_id, alias_id, normalize_prompt(prompt))
+        with self.lock:
+            flight = self.flights.get(key)
+            subscription = flight.subscribe() if flight else None
+            if subscription:
+                self.coalesced += 1
+                return subscription
+
+            flight = Flight(key, self.max_buffer_bytes)
+            subscription = flight.subscribe()
+            self.flights[key] = flight
+            self.invocations += 1
+
+        thread = threading.Thread(target=self._run, args=(flight, agent_id, alias_id, prompt), daemon=True)
+        thread.start()
+        return subscription
+
+    def _run(self, flight, agent_id, alias_id, prompt):
+        """Perform the invocation and publish chunks to every subscriber."""
+        error = None
+        try:
+            response = self.client.invoke_agent(
+                agentId=agent_id,
+                agentAliasId=alias_id,
+                sessionId=f"coalesced-{uuid.uuid4()}",
+                inputText=prompt
+            )
+            for event in response['completion']:
+                if 'chunk' in event and 'bytes' in event['chunk']:
+                    if not flight.publish(event['chunk']['bytes'].decode('utf-8')):
+                        # Every subscriber went away; stop reading the stream
+                        break
+        except Exception as e:
+            error = e
+        finally:
+            with self.lock:
+                if self.flights.get(flight.key) is flight:
+                    del self.flights[flight.key]
+            flight.close(error)
+
+def main():
+    parser = argparse.ArgumentParser(description='Send the same prompt from several callers through one invocation.')
+    parser.add_argument('prompt')
+    parser.add_argument('--callers', type=int, default=5)
+    parser.add_argument('--stagger', type=float, default=0.2, help='Seconds between caller start times')
+    args = parser.parse_args()
+
+    try:
+        with open('deployment_info.json', 'r') as f:
+            info = json.load(f)
+    except FileNotFoundError:
+        print("Error: deployment_info.json not found. Run deploy_agent.py first.")
+        return
+
+    coalescer = InvocationCoalescer()
+
+    def caller(i):
+        time.sleep(i * args.stagger)
+        started = time.monotonic()
+        first = None
+        parts = []
+        for chunk in coalescer.invoke(info['agent_id'], info['alias_id'], args.prompt):
+            if first is None:
+                first = time.monotonic() - started
+            parts.append(chunk)
+        return i, first, time.monotonic() - started, len(''.join(parts))
+
+    with ThreadPoolExecutor(max_workers=args.callers) as pool:
+        for i, first, total, length in pool.map(caller, range(args.callers)):
+            first_text = f"{first:.2f}s" if first is not None else "-"
+            print(f"Caller {i + 1}: first chunk {first_text}, total {total:.2f}s, {length} chars")
+
+    print(f"\n✓ {args.callers} caller(s) served by {coalescer.invocations} invocation(s) "
+          f"({coalescer.coalesced} coalesced)")
+
+if __name__ == '__main__':
+    main()
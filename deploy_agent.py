@@ -13,6 +13,7 @@ from agent_config import (
     AGENT_EXECUTION_ROLE,
     SHARED_S3_BUCKET
 )
+from analyze_prompts import approved_instruction
 
 def create_agent():
     """Create a Bedrock agent using existing resources."""
@@ -22,13 +23,17 @@ def create_agent():
     print(f"Using execution role: {AGENT_EXECUTION_ROLE}")
     print(f"Using S3 bucket: {SHARED_S3_BUCKET}")
     
+    instruction = approved_instruction(AGENT_CONFIG)
+    if instruction != AGENT_CONFIG['instruction']:
+        print("Using approved compacted instruction from compacted_instructions.json")
+    
     try:
         response = bedrock.create_agent(
             agentName=AGENT_CONFIG['agent_name'],
             agentResourceRoleArn=AGENT_EXECUTION_ROLE,
             description=AGENT_CONFIG['description'],
             foundationModel=AGENT_CONFIG['foundation_model'],
-            instruction=AGENT_CONFIG['instruction'],
+            instruction=instruction,
             idleSessionTTLInSeconds=AGENT_CONFIG['idle_session_ttl'],
             tags={'auto-delete': 'no'}
         )
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Show the status of every Bedrock agent in the account.
+Agent details, aliases, tags and S3 prefix usage are fetched concurrently and
+cached locally for a short time so repeated runs return instantly.
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+from agent_config import AWS_REGION, SHARED_S3_BUCKET
+
+CACHE_FILE = '.fleet_status_cache.json'
+CACHE_TTL = 60
+
+def list_all_agents(bedrock):
+    """Page through list_agents and return every agent summary."""
+    agents = []
+    paginator = bedrock.get_paginator('list_agents')
+    for page in paginator.paginate(PaginationConfig={'PageSize': 100}):
+        agents.extend(page.get('agentSummaries', []))
+    return agents
+
+def prefix_usage(s3, bucket, prefix):
+    """Return (object count, total bytes) under an S3 prefix."""
+    count = 0
+    size = 0
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            count += 1
+            size += obj['Size']
+    return count, size
+
+def describe_agent(bedrock, s3, summary):
+    """Collect details, aliases, tags and S3 usage for a single agent."""
+    agent_id = summary['agentId']
+    row = {
+        'agent_id': agent_id,
+        'agent_name': summary.get('agentName'),
+        'status': summary.get('agentStatus'),
+        'updated_at': str(summary.get('updatedAt', '')),
+    }
+
+    try:
+        agent = bedrock.get_agent(agentId=agent_id)['agent']
+        row['foundation_model'] = agent.get('foundationModel')
+        row['created_at'] = str(agent.get('createdAt', ''))
+
+        aliases = []
+        paginator = bedrock.get_paginator('list_agent_aliases')
+        for page in paginator.paginate(agentId=agent_id):
+            for alias in page.get('agentAliasSummaries', []):
+                versions = [r.get('agentVersion') for r in alias.get('routingConfiguration', [])]
+                aliases.append({
+                    'name': alias['agentAliasName'],
+                    'id': alias['agentAliasId'],
+                    'status': alias.get('agentAliasStatus'),
+                    'versions': versions
+                })
+        row['aliases'] = aliases
+
+        row['tags'] = bedrock.list_tags_for_resource(resourceArn=agent['agentArn']).get('tags', {})
+
+        count, size = prefix_usage(s3, SHARED_S3_BUCKET, f"agents/{row['agent_name']}/")
+        row['s3_objects'] = count
+        row['s3_bytes'] = size
+    except Exception as e:
+        row['error'] = str(e)
+
+    return row
+
+def collect_status(workers):
+    """Fetch the status of every agent in parallel."""
+    config = Config(max_pool_connections=workers, retries={'mode': 'adaptive', 'max_attempts': 10})
+    bedrock = boto3.client('bedrock-agent', region_name=AWS_REGION, config=config)
+    s3 = boto3.client('s3', region_name=AWS_REGION, config=config)
+
+    summaries = list_all_agents(bedrock)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        rows = list(pool.map(lambda summary: describe_agent(bedrock, s3, summary), summaries))
+
+    return sorted(rows, key=lambda row: row['agent_name'] or '')
+
+def load_cache(ttl):
+    """Return cached rows if the cache is younger than ttl seconds."""
+    try:
+        with open(CACHE_FILE, 'r') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if cache.get('region') != AWS_REGION or time.time() - cache.get('fetched_at', 0) > ttl:
+        return None
+    return cache['agents']
+
+def save_cache(rows):
+    """Write rows to the local cache."""
+    tmp_path = f"{CACHE_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'region': AWS_REGION, 'fetched_at': time.time(), 'agents': rows}, f)
+    os.replace(tmp_path, CACHE_FILE)
+
+def format_size(size):
+    """Human readable byte count."""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.0f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
+
+def print_table(rows):
+    """Render rows as a fixed-width table."""
+    headers = ['AGENT NAME', 'AGENT ID', 'STATUS', 'ALIASES', 'AUTO-DELETE', 'S3 OBJECTS', 'S3 SIZE']
+    table = []
+    for row in rows:
+        if 'error' in row:
+            table.append([row['agent_name'] or '', row['agent_id'], row['status'] or '', f"error: {row['error']}", '', '', ''])
+            continue
+        aliases = ', '.join(f"{a['name']}->{'/'.join(v for v in a['versions'] if v)}" for a in row['aliases'])
+        table.append([
+            row['agent_name'] or '',
+            row['agent_id'],
+            row['status'] or '',
+            aliases or '-',
+            row['tags'].get('auto-delete', '-'),
+            str(row['s3_objects']),
+            format_size(row['s3_bytes'])
+        ])
+
+    widths = [max(len(h), *(len(r[i]) for r in table)) if table else len(h) for i, h in enumerate(headers)]
+    print('  '.join(h.ljust(w) for h, w in zip(headers, widths)))
+    print('  '.join('-' * w for w in widths))
+    for r in table:
+        print('  '.join(c.ljust(w) for c, w in zip(r, widths)))
+    print(f"\n{len(rows)} agent(s) in {AWS_REGION}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the status of all Bedrock agents.')
+    parser.add_argument('--json', action='store_true', help='Print JSON instead of a table')
+    parser.add_argument('--refresh', action='store_true', help='Ignore the local cache')
+    parser.add_argument('--ttl', type=int, default=CACHE_TTL, help='Cache lifetime in seconds')
+    parser.add_argument('--workers', type=int, default=32)
+    args = parser.parse_args()
+
+    rows = None if args.refresh else load_cache(args.ttl)
+    if rows is None:
+        try:
+            rows = collect_status(args.workers)
+        except Exception as e:
+            print(f"✗ Error listing agents: {e}")
+            return
+        save_cache(rows)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Persistent priority queue and worker service for agent invocations.
+Jobs are stored in a local SQLite file with a priority, optional deadline and retry
+budget. Workers run them under per-agent concurrency limits and write each result
+to the agent's artifacts/ or output/ prefix in the shared bucket.
+
+Interactive jobs always sort ahead of batch jobs, some workers are reserved for
+them, and batch jobs may not fill an agent's last --interactive-headroom slots, so
+a large batch backfill cannot starve interactive requests. --per-agent is a hard
+cap on running jobs of either kind.
+
+Commands:
+    submit  add a job
+    serve   run the worker pool
+    stats   print queue depth and wait times
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import boto3
+from botocore.config import Config
+
+from agent_config import AWS_REGION, SHARED_S3_BUCKET
+
+QUEUE_DB = 'job_queue.db'
+METRICS_FILE = 'job_queue.prom'
+LEASE_SECONDS = 900
+POLL_SECONDS = 0.5
+# Batch jobs gain one priority point per AGING_SECONDS waited so they are never starved either
+AGING_SECONDS = 300
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    agent_name TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    alias_id TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    output_prefix TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    deadline REAL,
+    not_before REAL NOT NULL,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_until REAL,
+    result_uri TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, kind, not_before);
+'''
+
+def connect(path=QUEUE_DB):
+    """Open the queue database, creating the schema on first use."""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+def submit(conn, agent_name, agent_id, alias_id, prompt, kind='batch', priority=0,
+           deadline_seconds=None, max_attempts=3, output_prefix='output'):
+    """Queue a job and return its id."""
+    now = time.time()
+    job_id = str(uuid.uuid4())
+    conn.execute('''
+        INSERT INTO jobs (id, kind, priority, agent_name, agent_id, alias_id, prompt, output_prefix,
+                          status, max_attempts, deadline, not_before, enqueued_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?, ?)
+    ''', (job_id, kind, priority, agent_name, agent_id, alias_id, prompt, output_prefix,
+          max_attempts, now + deadline_seconds if deadline_seconds else None, now, now))
+    return job_id
+
+def recover(conn, now=None):
+    """
+    Requeue jobs whose worker died without finishing (lease expired), or fail them if
+    they have used their attempts, so a job that crashes its worker is not retried forever.
+    """
+    now = now or time.time()
+    conn.execute(
+        "UPDATE jobs SET status = 'failed', finished_at = ?, lease_until = NULL, error = 'lease expired' "
+        "WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts",
+        (now, now)
+    )
+    cursor = conn.execute(
+        "UPDATE jobs SET status = 'queued', lease_until = NULL WHERE status = 'running' AND lease_until < ?",
+        (now,)
+    )
+    return cursor.rowcount
+
+def claim(conn, kinds, per_agent_limit, interactive_headroom=1):
+    """Atomically take the best runnable job of the given kinds, or return None.
+
+    An agent never has more than per_agent_limit running jobs. Batch jobs may only use
+    per_agent_limit - interactive_headroom of them (at least one), leaving the rest
+    for interactive jobs.
+    """
+    batch_limit = max(per_agent_limit - interactive_headroom, 1)
+    now = time.time()
+    placeholders = ','.join('?' for _ in kinds)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Jobs orphaned by a crashed worker would otherwise hold their agent's slots until restart
+        recover(conn, now)
+        conn.execute(
+            "UPDATE jobs SET status = 'expired', finished_at = ?, error = 'deadline passed' "
+            "WHERE status = 'queued' AND deadline IS NOT NULL AND deadline < ?",
+            (now, now)
+        )
+        row = conn.execute(f'''
+            SELECT id, agent_name, agent_id, alias_id, prompt, output_prefix, attempts, enqueued_at
+            FROM jobs
+            WHERE status = 'queued' AND not_before <= ? AND kind IN ({placeholders})
+              AND (
+                  SELECT COUNT(*) FROM jobs AS running
+                  WHERE running.status = 'running' AND running.agent_id = jobs.agent_id
+              ) < CASE kind WHEN 'interactive' THEN ? ELSE ? END
+            ORDER BY CASE kind WHEN 'interactive' THEN 0 ELSE 1 END,
+                     priority + (? - enqueued_at) / ? DESC,
+                     COALESCE(deadline, 1e18),
+                     enqueued_at
+            LIMIT 1
+        ''', (now, *kinds, per_agent_limit, batch_limit, now, AGING_SECONDS)).fetchone()
+        if row is None:
+            conn.execute('COMMIT')
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, lease_until = ? WHERE id = ?",
+            (now, now + LEASE_SECONDS, row[0])
+        )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+    keys = ('id', 'agent_name', 'agent_id', 'alias_id', 'prompt', 'output_prefix', 'attempts', 'enqueued_at')
+    return dict(zip(keys, row))
+
+def complete(conn, job_id, result_uri):
+    conn.execute(
+        "UPDATE jobs SET status = 'done', finished_at = ?, lease_until = NULL, result_uri = ?, error = NULL WHERE id = ?",
+        (time.time(), result_uri, job_id)
+    )
+
+def fail(conn, job, error):
+    """Schedule a retry with exponential backoff, or mark the job failed."""
+    row = conn.execute('SELECT attempts, max_attempts FROM jobs WHERE id = ?', (job['id'],)).fetchone()
+    now = time.time()
+    if row and row[0] < row[1]:
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', lease_until = NULL, not_before = ?, error = ? WHERE id = ?",
+            (now + 2 ** row[0], str(error), job['id'])
+        )
+        return True
+    conn.execute(
+        "UPDATE jobs SET status = 'failed', finished_at = ?, lease_until = NULL, error = ? WHERE id = ?",
+        (now, str(error), job['id'])
+    )
+    return False
+
+def run_job(runtime, s3, job):
+    """Invoke the agent and store the response; returns the result URI."""
+    response = runtime.invoke_agent(
+        agentId=job['agent_id'],
+        agentAliasId=job['alias_id'],
+        sessionId=f"job-{job['id']}",
+        inputText=job['prompt']
+    )
+    text = ''.join(
+        event['chunk']['bytes'].decode('utf-8')
+        for event in response['completion'] if 'chunk' in event and 'bytes' in event['chunk']
+    )
+
+    key = f"agents/{job['agent_name']}/{job['output_prefix']}/jobs/{job['id']}.json"
+    s3.put_object(
+        Bucket=SHARED_S3_BUCKET,
+        Key=key,
+        Body=json.dumps({'job_id': job['id'], 'prompt': job['prompt'], 'response': text}, indent=2).encode('utf-8'),
+        ContentType='application/json'
+    )
+    return f"s3://{SHARED_S3_BUCKET}/{key}"
+
+def queue_stats(conn):
+    """Queue depth per kind/status and wait times of jobs started in the last hour."""
+    depth = conn.execute('SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status').fetchall()
+    waits = conn.execute('''
+        SELECT kind, COUNT(*), AVG(started_at - enqueued_at), MAX(started_at - enqueued_at)
+        FROM jobs WHERE started_at IS NOT NULL AND started_at > ?
+        GROUP BY kind
+    ''', (time.time() - 3600,)).fetchall()
+    oldest = conn.execute(
+        "SELECT kind, MIN(enqueued_at) FROM jobs WHERE status = 'queued' GROUP BY kind"
+    ).fetchall()
+    return depth, waits, oldest
+
+def write_metrics(conn, path=METRICS_FILE):
+    """Export queue metrics in Prometheus text format (for the node_exporter textfile collector)."""
+    depth, waits, oldest = queue_stats(conn)
+    now = time.time()
+    lines = [
+        '# HELP agent_job_queue_jobs Jobs by kind and status',
+        '# TYPE agent_job_queue_jobs gauge'
+    ]
+    lines += [f'agent_job_queue_jobs{{kind="{k}",status="{s}"}} {n}' for k, s, n in depth]
+    lines += [
+        '# HELP agent_job_queue_wait_seconds Wait from enqueue to start over the last hour',
+        '# TYPE agent_job_queue_wait_seconds gauge'
+    ]
+    for kind, _, avg_wait, max_wait in waits:
+        lines.append(f'agent_job_queue_wait_seconds{{kind="{kind}",stat="avg"}} {avg_wait:.3f}')
+        lines.append(f'agent_job_queue_wait_seconds{{kind="{kind}",stat="max"}} {max_wait:.3f}')
+    lines += [
+        '# HELP agent_job_queue_oldest_seconds Age of the oldest queued job',
+        '# TYPE agent_job_queue_oldest_seconds gauge'
+    ]
+    lines += [f'agent_job_queue_oldest_seconds{{kind="{k}"}} {now - t:.3f}' for k, t in oldest]
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
+
+def worker(index, kinds, args, stop):
+    """Worker loop: claim, run, record outcome."""
+    conn = connect()
+    config = Config(retries={'mode': 'adaptive', 'max_attempts': 5})
+    runtime = boto3.client('bedrock-agent-runtime', region_name=AWS_REGION, config=config)
+    s3 = boto3.client('s3', region_name=AWS_REGION)
+
+    while not stop.is_set():
+        job = claim(conn, kinds, args.per_agent, args.interactive_headroom)
+        if job is None:
+            stop.wait(POLL_SECONDS)
+            continue
+
+        wait = time.time() - job['enqueued_at']
+        try:
+            result_uri = run_job(runtime, s3, job)
+            complete(conn, job['id'], result_uri)
+            print(f"[worker {index}] ✓ {job['id']} (waited {wait:.1f}s) -> {result_uri}")
+        except Exception as e:
+            retrying = fail(conn, job, e)
+            print(f"[worker {index}] ✗ {job['id']} attempt {job['attempts'] + 1}: {e}"
+                  + (" (will retry)" if retrying else ""))
+
+def serve(args):
+    """Run the worker pool until interrupted."""
+    conn = connect()
+    recovered = recover(conn)
+    if recovered:
+        print(f"Requeued {recovered} job(s) from a previous run")
+
+    reserved = min(args.reserved_interactive, args.workers)
+    print(f"Starting {args.workers} worker(s): {reserved} interactive-only, "
+          f"per-agent limit {args.per_agent} ({max(args.per_agent - args.interactive_headroom, 1)} for batch)")
+
+    stop = threading.Event()
+    threads = []
+    for i in range(args.workers):
+        kinds = ('interactive',) if i < reserved else ('interactive', 'batch')
+        thread = threading.Thread(target=worker, args=(i, kinds, args, stop), daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    try:
+        while True:
+            write_metrics(conn)
+            time.sleep(args.metrics_interval)
+    except KeyboardInterrupt:
+        print("\nStopping workers...")
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+def print_stats(conn):
+    depth, waits, oldest = queue_stats(conn)
+    print("=" * 60)
+    print("Job Queue")
+    print("=" * 60)
+    for kind, status, count in depth:
+        print(f"   {kind:<12} {status:<8} {count}")
+    for kind, count, avg_wait, max_wait in waits:
+        print(f"   {kind:<12} wait avg {avg_wait:.1f}s max {max_wait:.1f}s ({count} started in last hour)")
+    for kind, enqueued_at in oldest:
+        print(f"   {kind:<12} oldest queued {time.time() - enqueued_at:.0f}s ago")
+
+def main():
+    parser = argparse.ArgumentParser(description='Priority job queue for agent invocations.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    submit_parser = subparsers.add_parser('submit', help='Queue an invocation')
+    submit_parser.add_argument('prompt')
+    submit_parser.add_argument('--kind', choices=['interactive', 'batch'], default='batch')
+    submit_parser.add_argument('--priority', type=int, default=0)
+    submit_parser.add_argument('--deadline-seconds', type=float, default=None)
+    submit_parser.add_argument('--max-attempts', type=int, default=3)
+    submit_parser.add_argument('--output-prefix', choices=['output', 'artifacts'], default='output')
+
+    serve_parser = subparsers.add_parser('serve', help='Run workers')
+    serve_parser.add_argument('--workers', type=int, default=8)
+    serve_parser.add_argument('--per-agent', type=int, default=4, help='Maximum running jobs per agent (all kinds)')
+    serve_parser.add_argument('--interactive-headroom', type=int, default=1,
+                              help='Per-agent slots batch jobs may not use (batch always gets at least one)')
+    serve_parser.add_argument('--reserved-interactive', type=int, default=2,
+                              help='Workers that only take interactive jobs')
+    serve_parser.add_argument('--metrics-interval', type=float, default=15)
+
+    subparsers.add_parser('stats', help='Show queue depth and wait times')
+
+    args = parser.parse_args()
+    conn = connect()
+
+    if args.command == 'submit':
+        try:
+            with open('deployment_info.json', 'r') as f:
+                info = json.load(f)
+        except FileNotFoundError:
+            print("Error: deployment_info.json not found. Run deploy_agent.py first.")
+            return
+        job_id = submit(conn, info['agent_name'], info['agent_id'], info['alias_id'], args.prompt,
+                        kind=args.kind, priority=args.priority, deadline_seconds=args.deadline_seconds,
+                        max_attempts=args.max_attempts, output_prefix=args.output_prefix)
+        print(f"✓ Queued {args.kind} job {job_id}")
+    elif args.command == 'serve':
+        serve(args)
+    else:
+        print_stats(conn)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Pre-process sports videos before sending them to the agent.
+Samples frames on scene changes, crops scoreboard candidates, drops near-duplicates
+and uploads a compact frame set plus manifest under the agent's artifacts/ prefix.
+
+Requires: pip install opencv-python-headless
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import boto3
+import cv2
+
+from agent_config import AWS_REGION, S3_ARTIFACTS_PATH, S3_VIDEOS_PATH
+
+# Histogram distance above which a frame is treated as a new scene
+SCENE_THRESHOLD = 0.35
+# Maximum Hamming distance between dHashes for two frames to count as duplicates
+HASH_DISTANCE = 6
+# Only every Nth decoded frame is inspected for scene changes
+FRAME_STRIDE = 5
+# Candidate scoreboard regions as (name, y0, y1, x0, x1) fractions of the frame
+SCOREBOARD_REGIONS = [
+    ('top', 0.0, 0.15, 0.0, 1.0),
+    ('bottom', 0.85, 1.0, 0.0, 1.0),
+    ('top-left', 0.0, 0.2, 0.0, 0.4),
+    ('top-right', 0.0, 0.2, 0.6, 1.0),
+]
+JPEG_QUALITY = 85
+
+def split_s3_uri(uri):
+    """Split an s3://bucket/key URI into (bucket, key)."""
+    bucket, _, key = uri[len('s3://'):].partition('/')
+    return bucket, key
+
+def dhash(image, size=8):
+    """Compute a 64-bit difference hash for a BGR or grayscale image."""
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    resized = cv2.resize(image, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (resized[:, 1:] > resized[:, :-1]).flatten()
+    return int(''.join('1' if b else '0' for b in bits), 2)
+
+def hamming(a, b):
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count('1')
+
+def histogram(frame):
+    """Normalized HSV histogram used for scene-change detection."""
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1], None, [32, 32], [0, 180, 0, 256])
+    return cv2.normalize(hist, hist).flatten()
+
+def crop_regions(frame):
+    """Yield (name, crop) for each candidate scoreboard region."""
+    height, width = frame.shape[:2]
+    for name, y0, y1, x0, x1 in SCOREBOARD_REGIONS:
+        yield name, frame[int(y0 * height):int(y1 * height), int(x0 * width):int(x1 * width)]
+
+def extract_frames(video_path, output_dir):
+    """
+    Decode a video frame by frame and write the selected frames and crops to output_dir.
+    Runs inside a worker process; returns the manifest for the video.
+    """
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise RuntimeError(f"Cannot open video: {video_path}")
+
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    os.makedirs(output_dir, exist_ok=True)
+
+    previous_hist = None
+    kept_hashes = []
+    region_hashes = {}
+    frames = []
+    index = -1
+
+    while True:
+        ok = capture.grab()
+        if not ok:
+            break
+        index += 1
+        if index % FRAME_STRIDE:
+            continue
+
+        ok, frame = capture.retrieve()
+        if not ok:
+            break
+
+        hist = histogram(frame)
+        if previous_hist is not None:
+            distance = cv2.compareHist(previous_hist, hist, cv2.HISTCMP_BHATTACHARYYA)
+            if distance < SCENE_THRESHOLD:
+                continue
+        previous_hist = hist
+
+        frame_hash = dhash(frame)
+        if any(hamming(frame_hash, h) <= HASH_DISTANCE for h in kept_hashes):
+            continue
+        kept_hashes.append(frame_hash)
+
+        name = f"frame_{index:07d}.jpg"
+        cv2.imwrite(os.path.join(output_dir, name), frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        entry = {
+            'file': name,
+            'frame_index': index,
+            'timestamp': round(index / fps, 3),
+            'dhash': f"{frame_hash:016x}",
+            'scoreboard_crops': []
+        }
+
+        for region, crop in crop_regions(frame):
+            if crop.size == 0:
+                continue
+            crop_hash = dhash(crop)
+            seen = region_hashes.setdefault(region, [])
+            if any(hamming(crop_hash, h) <= HASH_DISTANCE for h in seen):
+                continue
+            seen.append(crop_hash)
+            crop_name = f"scoreboard_{region}_{index:07d}.jpg"
+            cv2.imwrite(os.path.join(output_dir, crop_name), crop, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            entry['scoreboard_crops'].append({'region': region, 'file': crop_name})
+
+        frames.append(entry)
+
+    capture.release()
+
+    return {
+        'source': os.path.basename(video_path),
+        'fps': fps,
+        'decoded_frames': index + 1,
+        'selected_frames': len(frames),
+        'frames': frames
+    }
+
+def list_videos(s3, videos_uri):
+    """S3 URIs of every .mp4 under the agent's videos/ prefix."""
+    bucket, prefix = split_s3_uri(videos_uri)
+    uris = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix.rstrip('/') + '/'):
+        for obj in page.get('Contents', []):
+            if obj['Key'].lower().endswith('.mp4'):
+                uris.append(f"s3://{bucket}/{obj['Key']}")
+    return uris
+
+def video_names(videos, videos_uri):
+    """
+    Name each video by its path relative to the videos/ prefix (or, for local files,
+    their deepest common directory), without extension. Names key the local frame
+    directory and the frames/ prefix, so videos/2024/game.mp4 and videos/2025/game.mp4
+    do not collide.
+    """
+    if videos and videos[0].startswith('s3://'):
+        root = split_s3_uri(videos_uri)[1].rstrip('/') + '/'
+        relative = {uri: split_s3_uri(uri)[1][len(root):] for uri in videos}
+    else:
+        abs_paths = {path: os.path.abspath(path) for path in videos}
+        root = os.path.commonpath([os.path.dirname(p) for p in abs_paths.values()])
+        relative = {path: os.path.relpath(abs_path, root).replace(os.sep, '/') for path, abs_path in abs_paths.items()}
+    return {source: os.path.splitext(name)[0] for source, name in relative.items()}
+
+def process_video(source, name, work_dir):
+    """
+    Worker process task: download the video if it is in S3, extract its frames into
+    work_dir/<name> and delete the downloaded copy. Returns (manifest, frame_dir).
+    """
+    frame_dir = os.path.join(work_dir, *name.split('/'))
+    if not source.startswith('s3://'):
+        manifest = extract_frames(source, frame_dir)
+    else:
+        bucket, key = split_s3_uri(source)
+        local_path = frame_dir + os.path.splitext(key)[1]
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        boto3.client('s3', region_name=AWS_REGION).download_file(bucket, key, local_path)
+        try:
+            manifest = extract_frames(local_path, frame_dir)
+        finally:
+            os.remove(local_path)
+    manifest.update(source=source, name=name)
+    return manifest, frame_dir
+
+def upload_frame_set(s3, manifest, frame_dir, artifacts_uri):
+    """Upload extracted frames and the manifest; returns the manifest URI."""
+    bucket, prefix = split_s3_uri(artifacts_uri)
+    base_key = f"{prefix.rstrip('/')}/frames/{manifest['name']}"
+
+    for entry in manifest['frames']:
+        files = [entry['file']] + [crop['file'] for crop in entry['scoreboard_crops']]
+        for name in files:
+            s3.upload_file(
+                os.path.join(frame_dir, name), bucket, f"{base_key}/{name}",
+                ExtraArgs={'ContentType': 'image/jpeg'}
+            )
+
+    manifest['s3_prefix'] = f"s3://{bucket}/{base_key}"
+    manifest_key = f"{base_key}/manifest.json"
+    s3.put_object(
+        Bucket=bucket,
+        Key=manifest_key,
+        Body=json.dumps(manifest, indent=2).encode('utf-8'),
+        ContentType='application/json'
+    )
+    return f"s3://{bucket}/{manifest_key}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract keyframes and scoreboard crops from sports videos.')
+    parser.add_argument('videos', nargs='*', help='Local video files (default: all .mp4 under S3_VIDEOS_PATH)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Decoding processes')
+    parser.add_argument('--no-upload', action='store_true', help='Keep frames locally only')
+    parser.add_argument('--output-dir', default=None, help='Local directory for extracted frames')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Video Pre-processing")
+    print("=" * 60)
+
+    s3 = boto3.client('s3', region_name=AWS_REGION)
+
+    videos = args.videos or list_videos(s3, S3_VIDEOS_PATH)
+    if not videos:
+        print(f"No videos found under {S3_VIDEOS_PATH}")
+        return
+
+    # Frames only need to outlive the upload unless the caller asked to keep them
+    work_dir = args.output_dir or tempfile.mkdtemp(prefix='video-preprocess-')
+    keep_frames = bool(args.output_dir) or args.no_upload
+    os.makedirs(work_dir, exist_ok=True)
+
+    print(f"\nProcessing {len(videos)} video(s) with {args.workers} worker(s)")
+    print(f"Local frame directory: {work_dir}")
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # Each task downloads its own video, so decoding starts after the first download
+        names = video_names(videos, S3_VIDEOS_PATH)
+        futures = {pool.submit(process_video, path, names[path], work_dir): path for path in videos}
+
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                manifest, frame_dir = future.result()
+            except Exception as e:
+                print(f"✗ {path}: {e}")
+                failed += 1
+                continue
+
+            print(f"✓ {path}: kept {manifest['selected_frames']} of {manifest['decoded_frames']} frames")
+
+            if args.no_upload:
+                with open(os.path.join(frame_dir, 'manifest.json'), 'w') as f:
+                    json.dump(manifest, f, indent=2)
+                continue
+
+            try:
+                manifest_uri = upload_frame_set(s3, manifest, frame_dir, S3_ARTIFACTS_PATH)
+                print(f"  Manifest: {manifest_uri}")
+            except Exception as e:
+                print(f"✗ Error uploading frames for {path}: {e}")
+                failed += 1
+            if not keep_frames:
+                shutil.rmtree(frame_dir, ignore_errors=True)
+
+    if not keep_frames:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\n" + "=" * 60)
+    if failed:
+        print(f"✗ {failed} video(s) failed")
+    else:
+        print("✓ Pre-processing complete!")
+        print("\nPass the manifest URI to the agent instead of the full video.")
+    print("=" * 60)
+
+if __name__ == '__main__':
+    main()
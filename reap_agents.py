@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Bulk cleanup of stale agents across the account.
+Agents are selected by tag, age and last activity, then their aliases, the agent
+itself and its S3 prefix are deleted concurrently. Runs as a dry-run unless
+--execute is given; progress is journaled so an interrupted sweep can resume.
+Each agent in a plan is re-checked right before it is deleted.
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+import boto3
+from botocore.config import Config
+
+from agent_config import AWS_REGION, SHARED_S3_BUCKET
+
+JOURNAL_FILE = 'reap_journal.jsonl'
+PLAN_FILE = 'reap_plan.json'
+# The built-in draft alias cannot be deleted
+TEST_ALIAS_ID = 'TSTALIASID'
+STEPS = ('aliases', 'agent', 's3_prefix')
+
+class RateLimiter:
+    """Simple token bucket shared by all worker threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_time = time.monotonic()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+class Journal:
+    """Append-only record of completed steps per agent."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = set()
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.done.add((entry['agent_id'], entry['step']))
+        except FileNotFoundError:
+            pass
+
+    def is_done(self, agent_id, step):
+        return (agent_id, step) in self.done
+
+    def record(self, agent_id, step):
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps({'agent_id': agent_id, 'step': step, 'at': time.time()}) + '\n')
+            self.done.add((agent_id, step))
+
+def make_clients(workers):
+    """Create clients with enough connections for the worker pool."""
+    config = Config(max_pool_connections=workers, retries={'mode': 'adaptive', 'max_attempts': 10})
+    return (
+        boto3.client('bedrock-agent', region_name=AWS_REGION, config=config),
+        boto3.client('s3', region_name=AWS_REGION, config=config)
+    )
+
+def last_prefix_write(s3, prefix):
+    """Most recent LastModified under the agent's S3 prefix, or None."""
+    latest = None
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=SHARED_S3_BUCKET, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if latest is None or obj['LastModified'] > latest:
+                latest = obj['LastModified']
+    return latest
+
+def inspect_agent(bedrock, s3, limiter, summary, args, now):
+    """Return a plan entry if the agent should be reaped, otherwise None."""
+    agent_id = summary['agentId']
+    name = summary['agentName']
+    if args.name_prefix and not name.startswith(args.name_prefix):
+        return None
+
+    limiter.wait()
+    agent = bedrock.get_agent(agentId=agent_id)['agent']
+    limiter.wait()
+    tags = bedrock.list_tags_for_resource(resourceArn=agent['agentArn']).get('tags', {})
+    if tags.get(args.tag_key) == args.keep_value:
+        return None
+
+    created_at = agent['createdAt']
+    if now - created_at < timedelta(hours=args.min_age_hours):
+        return None
+
+    aliases = []
+    paginator = bedrock.get_paginator('list_agent_aliases')
+    limiter.wait()
+    for page in paginator.paginate(agentId=agent_id):
+        aliases.extend(page.get('agentAliasSummaries', []))
+
+    # Bedrock has no "last invoked" field; use the latest alias/agent update and
+    # the latest write to the agent's S3 prefix as the activity signal
+    activity = [agent['updatedAt']] + [a['updatedAt'] for a in aliases if 'updatedAt' in a]
+    prefix = f"agents/{name}/"
+    last_write = last_prefix_write(s3, prefix)
+    if last_write:
+        activity.append(last_write)
+    last_activity = max(activity)
+    if now - last_activity < timedelta(hours=args.idle_hours):
+        return None
+
+    return {
+        'agent_id': agent_id,
+        'agent_name': name,
+        'created_at': created_at.isoformat(),
+        'last_activity': last_activity.isoformat(),
+        'tags': tags,
+        'aliases': [a['agentAliasId'] for a in aliases if a['agentAliasId'] != TEST_ALIAS_ID],
+        's3_prefix': prefix
+    }
+
+def build_plan(bedrock, s3, limiter, args):
+    """Scan every agent in the account and select the ones to delete."""
+    summaries = []
+    paginator = bedrock.get_paginator('list_agents')
+    for page in paginator.paginate(PaginationConfig={'PageSize': 100}):
+        summaries.extend(page.get('agentSummaries', []))
+    print(f"Scanning {len(summaries)} agent(s)...")
+
+    now = datetime.now(timezone.utc)
+    plan = []
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(inspect_agent, bedrock, s3, limiter, s, args, now) for s in summaries]
+        for future in as_completed(futures):
+            try:
+                entry = future.result()
+            except Exception as e:
+                print(f"   ? Skipping agent: {e}")
+                continue
+            if entry:
+                plan.append(entry)
+
+    return sorted(plan, key=lambda entry: entry['agent_name'])
+
+def delete_prefix(s3, limiter, prefix):
+    """
+    Delete every object version and delete marker under a prefix in batches of 1000.
+    The shared bucket is versioned, so deleting by key alone would only add delete markers.
+    """
+    deleted = 0
+    paginator = s3.get_paginator('list_object_versions')
+    limiter.wait()
+    for page in paginator.paginate(Bucket=SHARED_S3_BUCKET, Prefix=prefix):
+        objects = [{'Key': v['Key'], 'VersionId': v['VersionId']} for v in page.get('Versions', [])]
+        objects += [{'Key': d['Key'], 'VersionId': d['VersionId']} for d in page.get('DeleteMarkers', [])]
+        if objects:
+            limiter.wait()
+            response = s3.delete_objects(Bucket=SHARED_S3_BUCKET, Delete={'Objects': objects, 'Quiet': True})
+            errors = response.get('Errors', [])
+            if errors:
+                raise RuntimeError(f"{len(errors)} object version(s) under {prefix} not deleted: "
+                                   f"{errors[0].get('Code')} {errors[0].get('Message')}")
+            deleted += len(objects)
+        limiter.wait()
+    return deleted
+
+def reap_agent(bedrock, s3, limiter, journal, entry, args):
+    """
+    Delete aliases, the agent and its S3 prefix, skipping steps already journaled.
+    Returns 'deleted', or 'kept'/'gone' if the agent no longer qualifies or no longer exists.
+    """
+    agent_id = entry['agent_id']
+
+    if not journal.is_done(agent_id, 'agent'):
+        # The plan may be days old: re-check tags and activity (and pick up new aliases)
+        summary = {'agentId': agent_id, 'agentName': entry['agent_name']}
+        try:
+            current = inspect_agent(bedrock, s3, limiter, summary, args, datetime.now(timezone.utc))
+        except bedrock.exceptions.ResourceNotFoundException:
+            return 'gone'
+        if current is None:
+            return 'kept'
+        entry = current
+
+    if not journal.is_done(agent_id, 'aliases'):
+        for alias_id in entry['aliases']:
+            limiter.wait()
+            try:
+                bedrock.delete_agent_alias(agentId=agent_id, agentAliasId=alias_id)
+            except bedrock.exceptions.ResourceNotFoundException:
+                pass
+        journal.record(agent_id, 'aliases')
+
+    if not journal.is_done(agent_id, 'agent'):
+        limiter.wait()
+        try:
+            bedrock.delete_agent(agentId=agent_id, skipResourceInUseCheck=True)
+        except bedrock.exceptions.ResourceNotFoundException:
+            pass
+        journal.record(agent_id, 'agent')
+
+    if not journal.is_done(agent_id, 's3_prefix'):
+        delete_prefix(s3, limiter, entry['s3_prefix'])
+        journal.record(agent_id, 's3_prefix')
+    return 'deleted'
+
+def execute_plan(bedrock, s3, limiter, plan, args):
+    """Run the deletions concurrently; returns the number of failures."""
+    journal = Journal(args.journal)
+    pending = [e for e in plan if not all(journal.is_done(e['agent_id'], step) for step in STEPS)]
+    print(f"\nDeleting {len(pending)} agent(s) ({len(plan) - len(pending)} already done)")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(reap_agent, bedrock, s3, limiter, journal, e, args): e for e in pending}
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                outcome = future.result()
+                if outcome == 'kept':
+                    print(f"   - {entry['agent_name']} ({entry['agent_id']}) kept: tagged or active since the plan was made")
+                elif outcome == 'gone':
+                    print(f"   ? {entry['agent_name']} ({entry['agent_id']}) no longer exists; skipped")
+                else:
+                    print(f"   ✓ {entry['agent_name']} ({entry['agent_id']})")
+            except Exception as e:
+                failed += 1
+                print(f"   ✗ {entry['agent_name']} ({entry['agent_id']}): {e}")
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description='Delete stale Bedrock agents in bulk.')
+    parser.add_argument('--tag-key', default='auto-delete')
+    parser.add_argument('--keep-value', default='no', help='Agents with tag-key set to this value are kept')
+    parser.add_argument('--name-prefix', default=None, help='Only consider agents whose name starts with this')
+    parser.add_argument('--min-age-hours', type=float, default=24)
+    parser.add_argument('--idle-hours', type=float, default=24, help='Minimum time since last activity')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=10, help='Maximum Bedrock and S3 delete API calls per second')
+    parser.add_argument('--journal', default=JOURNAL_FILE)
+    parser.add_argument('--plan', default=None, help='Execute a previously saved plan instead of scanning')
+    parser.add_argument('--execute', action='store_true', help='Actually delete (default is dry-run)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Bulk Agent Cleanup" + ("" if args.execute else " (dry-run)"))
+    print("=" * 60)
+
+    bedrock, s3 = make_clients(args.workers)
+    limiter = RateLimiter(args.rate)
+
+    try:
+        if args.plan:
+            with open(args.plan, 'r') as f:
+                plan = json.load(f)
+        else:
+            plan = build_plan(bedrock, s3, limiter, args)
+    except Exception as e:
+        print(f"✗ Error building plan: {e}")
+        return
+
+    for entry in plan:
+        print(f"   - {entry['agent_name']} ({entry['agent_id']}) "
+              f"last activity {entry['last_activity']}, {len(entry['aliases'])} alias(es)")
+    print(f"\n{len(plan)} agent(s) selected for deletion")
+
+    if not args.execute:
+        with open(PLAN_FILE, 'w') as f:
+            json.dump(plan, f, indent=2)
+        print(f"✓ Plan saved to {PLAN_FILE}")
+        print(f"\nRun: python reap_agents.py --plan {PLAN_FILE} --execute")
+        return
+
+    if not plan:
+        return
+
+    confirm = input(f"\nDelete {len(plan)} agent(s) and their S3 prefixes? (yes/no): ")
+    if confirm.lower() != 'yes':
+        print("Cleanup cancelled.")
+        return
+
+    failed = execute_plan(bedrock, s3, limiter, plan, args)
+
+    print("\n" + "=" * 60)
+    if failed:
+        print(f"✗ {failed} agent(s) failed. Re-run the same command to resume.")
+    else:
+        print("✓ Cleanup complete!")
+    print("=" * 60)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Blue/green release of an agent version behind the production alias.
+A candidate alias is created from the prepared draft (which snapshots a new
+version), warmed with concurrent synthetic traffic and then measured against
+production under the same load.
+Production is switched to the new version with update_agent_alias only if p95
+latency and error rate are within thresholds, and is rolled back automatically if
+the post-promotion check fails.
+"""
+
+import argparse
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+from agent_config import AWS_REGION
+
+PRODUCTION_ALIAS = 'production'
+GOLDEN_PROMPTS_FILE = 'golden_prompts.json'
+
+def load_deployment_info():
+    """Load deployment information."""
+    try:
+        with open('deployment_info.json', 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print("Error: deployment_info.json not found. Run deploy_agent.py first.")
+        return None
+
+def load_prompts(agent_name):
+    """Golden prompts for the agent, used as synthetic warm-up traffic."""
+    try:
+        with open(GOLDEN_PROMPTS_FILE, 'r') as f:
+            prompts = [case['prompt'] for case in json.load(f).get(agent_name, [])]
+    except FileNotFoundError:
+        prompts = []
+    return prompts or ['What can you help me with?']
+
+def wait_for_alias(bedrock, agent_id, alias_id, timeout=300):
+    """Wait until an alias is PREPARED and return it."""
+    deadline = time.time() + timeout
+    while True:
+        alias = bedrock.get_agent_alias(agentId=agent_id, agentAliasId=alias_id)['agentAlias']
+        status = alias['agentAliasStatus']
+        if status == 'PREPARED':
+            return alias
+        if status == 'FAILED' or time.time() > deadline:
+            raise RuntimeError(f"Alias {alias_id} is {status}: {alias.get('failureReasons', [])}")
+        time.sleep(3)
+
+def alias_version(alias):
+    """Agent version an alias routes to."""
+    return alias['routingConfiguration'][0]['agentVersion']
+
+def find_alias(bedrock, agent_id, name):
+    """Return the alias summary with the given name, or None."""
+    paginator = bedrock.get_paginator('list_agent_aliases')
+    for page in paginator.paginate(agentId=agent_id):
+        for alias in page.get('agentAliasSummaries', []):
+            if alias['agentAliasName'] == name:
+                return alias
+    return None
+
+def invoke_once(runtime, agent_id, alias_id, prompt):
+    """Run one invocation to completion; returns (latency seconds, error or None)."""
+    started = time.perf_counter()
+    try:
+        response = runtime.invoke_agent(
+            agentId=agent_id,
+            agentAliasId=alias_id,
+            sessionId=f"release-{uuid.uuid4()}",
+            inputText=prompt
+        )
+        for _ in response['completion']:
+            pass
+        return time.perf_counter() - started, None
+    except Exception as e:
+        return time.perf_counter() - started, str(e)
+
+def measure(runtime, agent_id, alias_id, prompts, requests, concurrency):
+    """Send concurrent traffic to an alias and summarize latency and errors."""
+    jobs = [prompts[i % len(prompts)] for i in range(requests)]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda prompt: invoke_once(runtime, agent_id, alias_id, prompt), jobs))
+
+    latencies = sorted(latency for latency, error in results if error is None)
+    errors = [error for _, error in results if error is not None]
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else float('inf')
+    p50 = latencies[len(latencies) // 2] if latencies else float('inf')
+    return {'requests': requests, 'p50': p50, 'p95': p95, 'error_rate': len(errors) / requests, 'errors': errors[:3]}
+
+def measure_together(runtime, agent_id, alias_ids, prompts, requests, concurrency):
+    """Measure several aliases at the same time so each sees the same total load."""
+    with ThreadPoolExecutor(max_workers=len(alias_ids)) as pool:
+        return list(pool.map(lambda alias_id: measure(runtime, agent_id, alias_id, prompts, requests, concurrency),
+                             alias_ids))
+
+def within_thresholds(candidate, baseline, args):
+    """Return (ok, reasons) comparing candidate stats with baseline stats."""
+    reasons = []
+    if baseline and candidate['p95'] > baseline['p95'] * (1 + args.max_p95_regression):
+        reasons.append(f"p95 {candidate['p95']:.2f}s exceeds production {baseline['p95']:.2f}s "
+                       f"+{args.max_p95_regression:.0%}")
+    allowed_errors = (baseline['error_rate'] if baseline else 0) + args.max_error_rate_increase
+    if candidate['error_rate'] > allowed_errors:
+        reasons.append(f"error rate {candidate['error_rate']:.1%} exceeds {allowed_errors:.1%}")
+    return not reasons, reasons
+
+def print_stats(label, stats):
+    print(f"   {label:<11} p50 {stats['p50']:.2f}s  p95 {stats['p95']:.2f}s  "
+          f"errors {stats['error_rate']:.1%} ({stats['requests']} requests)")
+    for error in stats['errors']:
+        print(f"      ! {error}")
+
+def set_routing(bedrock, agent_id, alias_id, version):
+    """Point the production alias at an agent version without waiting for it."""
+    bedrock.update_agent_alias(
+        agentId=agent_id,
+        agentAliasId=alias_id,
+        agentAliasName=PRODUCTION_ALIAS,
+        routingConfiguration=[{'agentVersion': version}]
+    )
+
+def route(bedrock, agent_id, alias_id, version):
+    """Point the production alias at an agent version and wait until it is ready."""
+    set_routing(bedrock, agent_id, alias_id, version)
+    wait_for_alias(bedrock, agent_id, alias_id)
+
+def main():
+    parser = argparse.ArgumentParser(description='Release a new agent version with latency-gated promotion.')
+    parser.add_argument('--warmup-requests', type=int, default=20,
+                        help='Requests per alias before measuring (results discarded)')
+    parser.add_argument('--requests', type=int, default=40, help='Measured requests per alias')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--max-p95-regression', type=float, default=0.15,
+                        help='Allowed p95 increase over production (fraction)')
+    parser.add_argument('--max-error-rate-increase', type=float, default=0.02,
+                        help='Allowed error rate increase over production (fraction)')
+    parser.add_argument('--keep-candidate', action='store_true', help='Do not delete the candidate alias')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Agent Release (blue/green)")
+    print("=" * 60)
+
+    info = load_deployment_info()
+    if not info:
+        return
+    agent_id = info['agent_id']
+
+    config = Config(max_pool_connections=max(10, args.concurrency * 2), retries={'mode': 'adaptive', 'max_attempts': 5})
+    bedrock = boto3.client('bedrock-agent', region_name=AWS_REGION)
+    runtime = boto3.client('bedrock-agent-runtime', region_name=AWS_REGION, config=config)
+    prompts = load_prompts(info['agent_name'])
+
+    # 1. Snapshot the prepared draft into a candidate alias
+    candidate_name = f"candidate-{int(time.time())}"
+    print(f"\n1. Creating candidate alias {candidate_name}...")
+    candidate_id = None
+    try:
+        response = bedrock.create_agent_alias(agentId=agent_id, agentAliasName=candidate_name)
+        candidate_id = response['agentAlias']['agentAliasId']
+        candidate_version = alias_version(wait_for_alias(bedrock, agent_id, candidate_id))
+    except Exception as e:
+        print(f"✗ Error creating candidate alias: {e}")
+        if candidate_id:
+            try:
+                bedrock.delete_agent_alias(agentId=agent_id, agentAliasId=candidate_id)
+            except Exception as delete_error:
+                print(f"? Could not delete candidate alias {candidate_id}: {delete_error}")
+        return
+    print(f"   ✓ Candidate {candidate_id} -> version {candidate_version}")
+
+    promoted = False
+    try:
+        production = find_alias(bedrock, agent_id, PRODUCTION_ALIAS)
+        production_id = production['agentAliasId'] if production else None
+        previous_version = None
+        if production_id:
+            previous_version = alias_version(
+                bedrock.get_agent_alias(agentId=agent_id, agentAliasId=production_id)['agentAlias']
+            )
+
+        # 2. Warm up both aliases, then measure them under the same load
+        aliases = [candidate_id] + ([production_id] if production_id else [])
+        print("\n2. Comparing candidate with production...")
+        if args.warmup_requests:
+            print(f"   Warming up with {args.warmup_requests} requests per alias...")
+            measure_together(runtime, agent_id, aliases, prompts, args.warmup_requests, args.concurrency)
+        print(f"   Measuring with {args.requests} requests at concurrency {args.concurrency}...")
+        stats = measure_together(runtime, agent_id, aliases, prompts, args.requests, args.concurrency)
+        candidate_stats = stats[0]
+        baseline_stats = stats[1] if production_id else None
+
+        print_stats('candidate', candidate_stats)
+        if baseline_stats:
+            print_stats('production', baseline_stats)
+
+        ok, reasons = within_thresholds(candidate_stats, baseline_stats, args)
+        if not ok:
+            print("\n✗ Candidate rejected:")
+            for reason in reasons:
+                print(f"   - {reason}")
+            print("Production alias unchanged.")
+            return
+
+        # 3. Promote
+        print(f"\n3. Promoting version {candidate_version} to {PRODUCTION_ALIAS}...")
+        # From the moment routing changes, any failure must restore the previous version
+        if production_id:
+            set_routing(bedrock, agent_id, production_id, candidate_version)
+            promoted = True
+        else:
+            response = bedrock.create_agent_alias(
+                agentId=agent_id,
+                agentAliasName=PRODUCTION_ALIAS,
+                routingConfiguration=[{'agentVersion': candidate_version}]
+            )
+            production_id = response['agentAlias']['agentAliasId']
+            promoted = True
+        wait_for_alias(bedrock, agent_id, production_id)
+        print(f"   ✓ {PRODUCTION_ALIAS} ({production_id}) -> version {candidate_version}")
+
+        # 4. Verify production after the switch; roll back if it regressed. The candidate alias
+        # (same version) gets traffic at the same time so the load matches the step 2 baseline.
+        print("\n4. Verifying production after promotion...")
+        after_stats = measure_together(runtime, agent_id, [production_id, candidate_id], prompts,
+                                       args.requests, args.concurrency)[0]
+        print_stats('production', after_stats)
+        ok, reasons = within_thresholds(after_stats, baseline_stats, args)
+        if not ok and previous_version:
+            print(f"\n✗ Post-promotion check failed ({'; '.join(reasons)})")
+            print(f"   Rolling back to version {previous_version}...")
+            route(bedrock, agent_id, production_id, previous_version)
+            print("   ✓ Rollback complete")
+            return
+        if not ok:
+            print(f"\n? Post-promotion check failed ({'; '.join(reasons)}) but there is no previous version to restore")
+            return
+
+        info['alias_id'] = production_id
+        info['agent_version'] = candidate_version
+        with open('deployment_info.json', 'w') as f:
+            json.dump(info, f, indent=2)
+        print(f"\n✓ Release complete: {PRODUCTION_ALIAS} now serves version {candidate_version}")
+    except Exception as e:
+        print(f"\n✗ Release failed: {e}")
+        if promoted and previous_version:
+            print(f"   Rolling back to version {previous_version}...")
+            try:
+                route(bedrock, agent_id, production_id, previous_version)
+                print("   ✓ Rollback complete")
+            except Exception as rollback_error:
+                print(f"   ✗ Rollback failed: {rollback_error}")
+    finally:
+        if not args.keep_candidate:
+            try:
+                bedrock.delete_agent_alias(agentId=agent_id, agentAliasId=candidate_id)
+            except Exception as e:
+                print(f"? Could not delete candidate alias {candidate_id}: {e}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Byte-range access to objects under agent prefixes.
+Reads are split into fixed-size chunks fetched with parallel ranged GETs and kept
+in a local disk cache keyed by (bucket, key, etag, range). Cached chunks are read
+back through mmap, so a repeat read costs one HEAD per reader (to check the etag)
+instead of a download, and a tool that needs only a video header or a slice of an
+output JSON downloads just those bytes.
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+from agent_config import AWS_REGION
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'bedrock-agent-ranges')
+CHUNK_SIZE = 4 * 1024 * 1024
+
+def split_s3_uri(uri):
+    """Split an s3://bucket/key URI into (bucket, key)."""
+    bucket, _, key = uri[len('s3://'):].partition('/')
+    return bucket, key
+
+class RangeReader:
+    """Reads byte ranges of one S3 object through a chunked local cache."""
+
+    def __init__(self, bucket, key, s3=None, cache_dir=CACHE_DIR, chunk_size=CHUNK_SIZE, workers=8):
+        self.bucket = bucket
+        self.key = key
+        self.s3 = s3 or boto3.client(
+            's3', region_name=AWS_REGION, config=Config(max_pool_connections=max(workers, 10))
+        )
+        self.cache_dir = cache_dir
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.etag = None
+        self.size = None
+
+    def head(self):
+        """Fetch (and remember) the object's etag and size."""
+        if self.etag is None:
+            response = self.s3.head_object(Bucket=self.bucket, Key=self.key)
+            self.etag = response['ETag'].strip('"')
+            self.size = response['ContentLength']
+        return self.etag, self.size
+
+    def _chunk_path(self, start, end):
+        object_id = hashlib.sha256(f"{self.bucket}/{self.key}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, object_id, self.etag.replace('/', '_'), f"{start}-{end}")
+
+    def _fetch_chunk(self, start, end):
+        """Download bytes [start, end] into the cache unless already present."""
+        path = self._chunk_path(start, end)
+        if os.path.exists(path):
+            return path, False
+
+        response = self.s3.get_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Range=f"bytes={start}-{end}",
+            IfMatch=f'"{self.etag}"'
+        )
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for block in response['Body'].iter_chunks(1024 * 1024):
+                    f.write(block)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return path, True
+
+    def read(self, offset=0, length=None):
+        """Return bytes [offset, offset + length) of the object (to the end if length is None)."""
+        etag, size = self.head()
+        if offset >= size:
+            return b''
+        end = size if length is None else min(size, offset + length)
+        if end <= offset:
+            return b''
+
+        first = offset // self.chunk_size
+        last = (end - 1) // self.chunk_size
+        ranges = [
+            (i * self.chunk_size, min(size, (i + 1) * self.chunk_size) - 1)
+            for i in range(first, last + 1)
+        ]
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(ranges))) as pool:
+            paths = list(pool.map(lambda r: self._fetch_chunk(*r)[0], ranges))
+
+        parts = []
+        for (chunk_start, _), path in zip(ranges, paths):
+            lo = max(offset, chunk_start) - chunk_start
+            hi = min(end, chunk_start + self.chunk_size) - chunk_start
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                parts.append(view[lo:hi])
+        return b''.join(parts)
+
+    def cached_bytes(self):
+        """Total size of cached chunks for the current etag."""
+        self.head()
+        directory = os.path.dirname(self._chunk_path(0, 0))
+        if not os.path.isdir(directory):
+            return 0
+        return sum(os.path.getsize(os.path.join(directory, name))
+                   for name in os.listdir(directory) if not name.endswith('.part'))
+
+    def presign(self, expires=3600):
+        """Pre-signed GET URL for handing the object to a consumer without credentials."""
+        return self.s3.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self.key}, ExpiresIn=expires
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description='Read a byte range of an S3 object through a local cache.')
+    parser.add_argument('uri', help='s3://bucket/key')
+    parser.add_argument('--offset', type=int, default=0)
+    parser.add_argument('--length', type=int, default=64 * 1024, help='Bytes to read (0 for the rest of the object)')
+    parser.add_argument('--output', default=None, help='Write bytes to a file instead of stdout')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--presign', type=int, default=None, metavar='SECONDS',
+                        help='Print a pre-signed URL valid for SECONDS instead of reading')
+    args = parser.parse_args()
+
+    bucket, key = split_s3_uri(args.uri)
+    reader = RangeReader(bucket, key, chunk_size=args.chunk_size)
+
+    try:
+        if args.presign:
+            print(reader.presign(args.presign))
+            return
+        data = reader.read(args.offset, args.length or None)
+    except Exception as e:
+        print(f"✗ Error reading {args.uri}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(data)
+        print(f"✓ Wrote {len(data)} bytes of {reader.size} to {args.output} "
+              f"({reader.cached_bytes()} bytes cached locally)")
+    else:
+        sys.stdout.buffer.write(data)
+
+if __name__ == '__main__':
+    main()
@@ -25,12 +25,6 @@ aws ecr create-repository \
   --tags Key=auto-delete,Value=no \
   2>/dev/null || echo "   Repository already exists"
 
-# Tag existing repository if it already exists
-aws ecr tag-resource \
-  --resource-arn "arn:aws:ecr:$AWS_REGION:$AWS_ACCOUNT_ID:repository/$ECR_REPO_NAME" \
-  --tags Key=auto-delete,Value=no \
-  2>/dev/null || true
-
 echo "   ✓ ECR repository ready"
 
 # 2. Create S3 Bucket
@@ -38,11 +32,6 @@ echo ""
 echo "2. Creating S3 bucket: $S3_BUCKET_NAME"
 aws s3 mb "s3://$S3_BUCKET_NAME" --region "$AWS_REGION" 2>/dev/null || echo "   Bucket already exists"
 
-# Add tags
-aws s3api put-bucket-tagging \
-  --bucket "$S3_BUCKET_NAME" \
-  --tagging 'TagSet=[{Key=auto-delete,Value=no}]'
-
 # Enable versioning
 aws s3api put-bucket-versioning \
   --bucket "$S3_BUCKET_NAME" \
@@ -70,12 +59,6 @@ aws iam create-role \
   --tags Key=auto-delete,Value=no \
   2>/dev/null || echo "   Role already exists"
 
-# Tag existing role if it already exists
-aws iam tag-role \
-  --role-name BedrockAgentExecutionRole \
-  --tags Key=auto-delete,Value=no \
-  2>/dev/null || true
-
 # Attach Bedrock policy
 aws iam attach-role-policy \
   --role-name BedrockAgentExecutionRole \
@@ -119,12 +102,6 @@ aws iam create-policy \
   --tags Key=auto-delete,Value=no \
   2>/dev/null || echo "   Policy already exists"
 
-# Tag existing policy if it already exists
-aws iam tag-policy \
-  --policy-arn "arn:aws:iam::$AWS_ACCOUNT_ID:policy/BedrockAgentDeveloperPolicy" \
-  --tags Key=auto-delete,Value=no \
-  2>/dev/null || true
-
 echo "   ✓ Developer policy ready"
 
 # 5. Create folder structure in S3
@@ -137,6 +114,11 @@ aws s3api put-object --bucket "$S3_BUCKET_NAME" --key agents/sports-video-analyz
 
 echo "   ✓ S3 folders created"
 
+# 6. Tag resources that already existed (batched, only missing tags are written)
+echo ""
+echo "6. Tagging shared resources"
+python3 "$(dirname "$0")/tag_resources.py"
+
 echo ""
 echo "=========================================="
 echo "Infrastructure Setup Complete!"
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Batched tagging of shared infrastructure and agents.
+Current tags are read in bulk through the Resource Groups Tagging API, compared with
+the desired tags, and only the differences are written in batches of 20.
+IAM resources are not covered by the Tagging API and use the IAM tag calls instead.
+"""
+
+import argparse
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+from agent_config import AWS_REGION, AWS_ACCOUNT_ID, APPROVED_ECR_REPO, SHARED_S3_BUCKET
+
+DEFAULT_TAGS = {'auto-delete': 'no'}
+READ_BATCH = 100
+WRITE_BATCH = 20
+ROLE_NAME = 'BedrockAgentExecutionRole'
+POLICY_ARN = f"arn:aws:iam::{AWS_ACCOUNT_ID}:policy/BedrockAgentDeveloperPolicy"
+
+def batches(items, size):
+    """Split a list into chunks of at most size items."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def shared_resource_arns():
+    """ARNs of the shared ECR repository and S3 bucket."""
+    return [
+        f"arn:aws:ecr:{AWS_REGION}:{AWS_ACCOUNT_ID}:repository/{APPROVED_ECR_REPO}",
+        f"arn:aws:s3:::{SHARED_S3_BUCKET}"
+    ]
+
+def agent_arns(bedrock, all_agents):
+    """ARNs of every agent in the account, or only the locally deployed one."""
+    if all_agents:
+        arns = []
+        paginator = bedrock.get_paginator('list_agents')
+        for page in paginator.paginate(PaginationConfig={'PageSize': 100}):
+            for summary in page.get('agentSummaries', []):
+                arns.append(f"arn:aws:bedrock:{AWS_REGION}:{AWS_ACCOUNT_ID}:agent/{summary['agentId']}")
+        return arns
+
+    try:
+        with open('deployment_info.json', 'r') as f:
+            info = json.load(f)
+    except FileNotFoundError:
+        return []
+    return [f"arn:aws:bedrock:{info['region']}:{info['account_id']}:agent/{info['agent_id']}"]
+
+def current_tags(tagging, arns):
+    """Read tags for all ARNs with get_resources, 100 ARNs per call."""
+    tags = {arn: {} for arn in arns}
+    for batch in batches(arns, READ_BATCH):
+        paginator = tagging.get_paginator('get_resources')
+        for page in paginator.paginate(ResourceARNList=batch):
+            for mapping in page.get('ResourceTagMappingList', []):
+                tags[mapping['ResourceARN']] = {t['Key']: t['Value'] for t in mapping.get('Tags', [])}
+    return tags
+
+def current_iam_tags(iam):
+    """Read tags for the execution role and developer policy."""
+    role_tags = iam.list_role_tags(RoleName=ROLE_NAME).get('Tags', [])
+    policy_tags = iam.list_policy_tags(PolicyArn=POLICY_ARN).get('Tags', [])
+    return {
+        f"arn:aws:iam::{AWS_ACCOUNT_ID}:role/{ROLE_NAME}": {t['Key']: t['Value'] for t in role_tags},
+        POLICY_ARN: {t['Key']: t['Value'] for t in policy_tags}
+    }
+
+def diff_tags(desired, current):
+    """Return the subset of desired tags that are missing or different."""
+    return {key: value for key, value in desired.items() if current.get(key) != value}
+
+def group_changes(changes):
+    """Group ARNs that need the same tag change so each group can be written in one call."""
+    groups = {}
+    for arn, tags in changes.items():
+        groups.setdefault(tuple(sorted(tags.items())), []).append(arn)
+    return groups
+
+def apply_tagging_api(tagging, changes):
+    """Write changes with tag_resources, 20 ARNs per call. Returns failed ARNs."""
+    jobs = []
+    for tag_items, arns in group_changes(changes).items():
+        for batch in batches(arns, WRITE_BATCH):
+            jobs.append((batch, dict(tag_items)))
+
+    def write(job):
+        batch, tags = job
+        response = tagging.tag_resources(ResourceARNList=batch, Tags=tags)
+        return response.get('FailedResourcesMap', {})
+
+    failed = {}
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for result in pool.map(write, jobs):
+            failed.update(result)
+    return failed
+
+def apply_iam(iam, changes):
+    """Write changes to the IAM role and policy. Returns failed ARNs."""
+    failed = {}
+    for arn, tags in changes.items():
+        tag_list = [{'Key': k, 'Value': v} for k, v in tags.items()]
+        try:
+            if ':role/' in arn:
+                iam.tag_role(RoleName=arn.rsplit('/', 1)[1], Tags=tag_list)
+            else:
+                iam.tag_policy(PolicyArn=arn, Tags=tag_list)
+        except Exception as e:
+            failed[arn] = {'ErrorMessage': str(e)}
+    return failed
+
+def parse_tags(values):
+    """Parse key=value arguments into a dict."""
+    tags = {}
+    for value in values:
+        key, sep, tag_value = value.partition('=')
+        if not sep:
+            raise SystemExit(f"Invalid tag '{value}', expected key=value")
+        tags[key] = tag_value
+    return tags
+
+def main():
+    parser = argparse.ArgumentParser(description='Tag shared resources and agents in bulk.')
+    parser.add_argument('--tag', action='append', default=[], help='Desired tag as key=value (repeatable)')
+    parser.add_argument('--all-agents', action='store_true', help='Tag every agent in the account')
+    parser.add_argument('--skip-iam', action='store_true', help='Do not check the IAM role and policy')
+    parser.add_argument('--check', action='store_true', help='Report differences without writing')
+    args = parser.parse_args()
+
+    desired = parse_tags(args.tag) if args.tag else DEFAULT_TAGS
+    config = Config(max_pool_connections=16, retries={'mode': 'adaptive', 'max_attempts': 10})
+    tagging = boto3.client('resourcegroupstaggingapi', region_name=AWS_REGION, config=config)
+    bedrock = boto3.client('bedrock-agent', region_name=AWS_REGION, config=config)
+    iam = boto3.client('iam', region_name=AWS_REGION)
+
+    print("=" * 60)
+    print(f"Tagging resources with {', '.join(f'{k}: {v}' for k, v in desired.items())}")
+    print("=" * 60)
+
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            iam_future = None if args.skip_iam else pool.submit(current_iam_tags, iam)
+            arns = shared_resource_arns() + agent_arns(bedrock, args.all_agents)
+            api_tags = current_tags(tagging, arns)
+            iam_tags = iam_future.result() if iam_future else {}
+    except Exception as e:
+        print(f"✗ Error reading tags: {e}")
+        sys.exit(1)
+
+    api_changes = {arn: diff_tags(desired, tags) for arn, tags in api_tags.items()}
+    api_changes = {arn: tags for arn, tags in api_changes.items() if tags}
+    iam_changes = {arn: diff_tags(desired, tags) for arn, tags in iam_tags.items()}
+    iam_changes = {arn: tags for arn, tags in iam_changes.items() if tags}
+
+    total = len(api_tags) + len(iam_tags)
+    pending = len(api_changes) + len(iam_changes)
+    print(f"\n{total} resource(s) checked, {pending} need changes")
+    for arn, tags in list(api_changes.items()) + list(iam_changes.items()):
+        print(f"   - {arn}: {', '.join(f'{k}={v}' for k, v in tags.items())}")
+
+    if args.check or not pending:
+        print("\n✓ Check complete" if pending else "\n✓ All resources already tagged")
+        return
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        api_future = pool.submit(apply_tagging_api, tagging, api_changes)
+        iam_future = pool.submit(apply_iam, iam, iam_changes)
+        failed = {}
+        for future in (api_future, iam_future):
+            try:
+                failed.update(future.result())
+            except Exception as e:
+                print(f"✗ Error applying tags: {e}")
+                sys.exit(1)
+
+    for arn, error in failed.items():
+        print(f"   ✗ {arn}: {error.get('ErrorMessage', error)}")
+
+    if failed:
+        print(f"\n✗ {len(failed)} resource(s) could not be tagged")
+        sys.exit(1)
+    else:
+        print(f"\n✓ Tagged {pending} resource(s)")
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,14 @@
 Test the deployed Bedrock agent.
 """
 
+import argparse
 import boto3
 import json
 import time
 
+from trace_collector import TraceCollector
+from usage_tracker import InvocationUsage, record_usage
+
 def load_deployment_info():
     """Load deployment information."""
     try:
@@ -16,19 +20,23 @@ def load_deployment_info():
         print("Error: deployment_info.json not found. Run deploy_agent.py first.")
         return None
 
-def invoke_agent(agent_id, alias_id, prompt):
-    """Invoke the Bedrock agent with a prompt."""
+def invoke_agent(agent_id, alias_id, prompt, trace_dir=None):
+    """Invoke the Bedrock agent with a prompt. If trace_dir is set, save a span breakdown there."""
     bedrock_runtime = boto3.client('bedrock-agent-runtime', region_name='us-east-1')
     
     print(f"\nInvoking agent with prompt: {prompt}")
     print("-" * 60)
     
+    usage = InvocationUsage()
+    recorded = False
     try:
+        collector = TraceCollector(agent_id, alias_id, prompt) if trace_dir else None
         response = bedrock_runtime.invoke_agent(
             agentId=agent_id,
             agentAliasId=alias_id,
             sessionId=f"test-session-{int(time.time())}",
-            inputText=prompt
+            inputText=prompt,
+            enableTrace=True
         )
         
         # Process streaming response
@@ -36,7 +44,11 @@ def invoke_agent(agent_id, alias_id, prompt):
         full_response = ""
         
         for event in event_stream:
-            if 'chunk' in event:
+            if 'trace' in event:
+                usage.add_trace(event['trace'])
+                if collector:
+                    collector.add_trace(event['trace'])
+            elif 'chunk' in event:
                 chunk = event['chunk']
                 if 'bytes' in chunk:
                     text = chunk['bytes'].decode('utf-8')
@@ -44,13 +56,34 @@ def invoke_agent(agent_id, alias_id, prompt):
                     print(text, end='', flush=True)
         
         print("\n" + "-" * 60)
+        print(f"Tokens: {usage.input_tokens} in / {usage.output_tokens} out, "
+              f"{usage.orchestration_steps} orchestration step(s), {usage.elapsed_ms()}ms")
+        record_usage(agent_id, alias_id, prompt, usage)
+        recorded = True
+        
+        if collector:
+            collector.finish()
+            print(collector.summary())
+            print(f"Trace saved to {collector.save(trace_dir)}")
         return full_response
         
     except Exception as e:
         print(f"Error invoking agent: {e}")
+        # Failed calls count towards error rate and latency too
+        if not recorded:
+            usage.error = True
+            try:
+                record_usage(agent_id, alias_id, prompt, usage)
+            except Exception as record_error:
+                print(f"Could not record usage: {record_error}")
         return None
 
 def main():
+    parser = argparse.ArgumentParser(description='Test the deployed Bedrock agent.')
+    parser.add_argument('--trace', action='store_true', help='Print and save a step-level latency breakdown')
+    parser.add_argument('--trace-dir', default='traces', help='Directory for saved traces')
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("Bedrock Agent Test")
     print("=" * 60)
@@ -76,7 +109,8 @@ def main():
         print(f"Test {i}/{len(test_prompts)}")
         print(f"{'=' * 60}")
         
-        response = invoke_agent(info['agent_id'], info['alias_id'], prompt)
+        response = invoke_agent(info['agent_id'], info['alias_id'], prompt,
+                                trace_dir=args.trace_dir if args.trace else None)
         
         if i < len(test_prompts):
             print("\nWaiting 2 seconds before next test...")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for coalesce.py flight keys. Run with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coalesce import InvocationCoalescer, normalize_prompt
+
+class BlockingRuntime:
+    """invoke_agent stub whose streams stay open until release is set."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.prompts = []
+
+    def invoke_agent(self, **kwargs):
+        self.prompts.append(kwargs['inputText'])
+
+        def stream():
+            self.release.wait(5)
+            yield {'chunk': {'bytes': kwargs['inputText'].encode('utf-8')}}
+
+        return {'completion': stream()}
+
+class NormalizePromptTest(unittest.TestCase):
+
+    def test_whitespace_is_collapsed(self):
+        self.assertEqual(normalize_prompt('  Analyze\n the   video '), 'Analyze the video')
+
+    def test_case_is_kept(self):
+        self.assertNotEqual(
+            normalize_prompt('Analyze s3://bucket/videos/Game1.mp4'),
+            normalize_prompt('Analyze s3://bucket/videos/game1.mp4')
+        )
+
+class InvocationCoalescerTest(unittest.TestCase):
+
+    def test_uris_differing_in_case_do_not_share_a_flight(self):
+        runtime = BlockingRuntime()
+        coalescer = InvocationCoalescer(client=runtime)
+        upper = coalescer.invoke('AGENT', 'ALIAS', 'Analyze s3://bucket/videos/Game1.mp4')
+        lower = coalescer.invoke('AGENT', 'ALIAS', 'Analyze s3://bucket/videos/game1.mp4')
+        runtime.release.set()
+
+        self.assertEqual(upper.text(), 'Analyze s3://bucket/videos/Game1.mp4')
+        self.assertEqual(lower.text(), 'Analyze s3://bucket/videos/game1.mp4')
+        self.assertEqual(coalescer.invocations, 2)
+        self.assertEqual(coalescer.coalesced, 0)
+
+    def test_whitespace_variants_share_a_flight(self):
+        runtime = BlockingRuntime()
+        coalescer = InvocationCoalescer(client=runtime)
+        first = coalescer.invoke('AGENT', 'ALIAS', 'Analyze s3://bucket/videos/Game1.mp4')
+        second = coalescer.invoke('AGENT', 'ALIAS', 'Analyze  s3://bucket/videos/Game1.mp4 ')
+        runtime.release.set()
+
+        self.assertEqual(first.text(), second.text())
+        self.assertEqual(coalescer.invocations, 1)
+        self.assertEqual(coalescer.coalesced, 1)
+
+if __name__ == '__main__':
+    unittest.main()
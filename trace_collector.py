@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Collect invoke_agent trace events into a per-invocation span tree.
+Spans cover pre-processing, each orchestration step, model invocations,
+action group Lambdas, knowledge base lookups and post-processing, and can be
+exported as OpenTelemetry (OTLP/JSON) spans or a flamegraph-style text summary.
+
+Usage:
+    collector = TraceCollector(agent_id, alias_id, prompt)
+    for event in response['completion']:
+        if 'trace' in event:
+            collector.add_trace(event['trace'])
+    collector.finish()
+    print(collector.summary())
+"""
+
+import json
+import os
+import time
+
+PHASES = {
+    'preProcessingTrace': 'pre-processing',
+    'orchestrationTrace': 'orchestration',
+    'postProcessingTrace': 'post-processing',
+    'guardrailTrace': 'guardrail',
+}
+
+def new_id(size):
+    """Random hex id of the given byte length."""
+    return os.urandom(size).hex()
+
+def to_ns(value):
+    """Convert a boto3 datetime to epoch nanoseconds."""
+    return int(value.timestamp() * 1e9)
+
+class Span:
+    """A timed node in the trace tree."""
+
+    def __init__(self, name, start_ns, parent=None):
+        self.name = name
+        self.span_id = new_id(8)
+        self.parent = parent
+        self.start_ns = start_ns
+        self.end_ns = None
+        self.attributes = {}
+        self.children = []
+        if parent:
+            parent.children.append(self)
+
+    def duration_ms(self):
+        end = self.end_ns if self.end_ns is not None else self.start_ns
+        return (end - self.start_ns) / 1e6
+
+    def walk(self, depth=0):
+        """Yield (depth, span) in start-time order."""
+        yield depth, self
+        for child in sorted(self.children, key=lambda span: span.start_ns):
+            yield from child.walk(depth + 1)
+
+class TraceCollector:
+    """Builds a span tree from the 'trace' events of one invoke_agent stream."""
+
+    def __init__(self, agent_id, alias_id, prompt):
+        self.trace_id = new_id(16)
+        self.root = Span('invoke_agent', time.time_ns())
+        self.root.attributes.update({'agent.id': agent_id, 'agent.alias_id': alias_id, 'prompt': prompt[:200]})
+        self.phases = {}
+        self.open_spans = {}
+
+    def add_trace(self, part):
+        """Consume one 'trace' event (the TracePart) from the completion stream."""
+        now = time.time_ns()
+        trace = part.get('trace', {})
+
+        for phase_key, label in PHASES.items():
+            step = trace.get(phase_key)
+            if not step:
+                continue
+            for kind, body in step.items():
+                if not isinstance(body, dict):
+                    continue
+                phase = self._phase_span(label, body.get('traceId'), now)
+                self._handle(phase, kind, body, now)
+
+        failure = trace.get('failureTrace')
+        if failure:
+            self.root.attributes['error'] = True
+            self.root.attributes['error.message'] = failure.get('failureReason', '')
+
+    def finish(self):
+        """Close the root span and anything left open."""
+        now = time.time_ns()
+        for span in self.open_spans.values():
+            span.end_ns = now
+        self.open_spans.clear()
+        self.root.end_ns = now
+
+    def _phase_span(self, label, trace_id, now):
+        """Find or create the span for a phase / orchestration step and extend it to now."""
+        key = (label, trace_id)
+        span = self.phases.get(key)
+        if span is None:
+            name = label
+            if label == 'orchestration' and trace_id:
+                name = f"orchestration step {trace_id.rsplit('-', 1)[-1]}"
+            span = Span(name, now, self.root)
+            self.phases[key] = span
+        span.end_ns = max(span.end_ns or now, now)
+        return span
+
+    def _open(self, phase, slot, name, now):
+        span = Span(name, now, phase)
+        self.open_spans[(phase.span_id, slot)] = span
+        return span
+
+    def _close(self, phase, slot, name, now, metadata):
+        span = self.open_spans.pop((phase.span_id, slot), None)
+        if span is None:
+            span = Span(name, now, phase)
+        span.end_ns = now
+
+        if metadata.get('startTime') and metadata.get('endTime'):
+            span.start_ns = to_ns(metadata['startTime'])
+            span.end_ns = to_ns(metadata['endTime'])
+        elif metadata.get('totalTimeMs') is not None:
+            span.start_ns = span.end_ns - int(metadata['totalTimeMs'] * 1e6)
+        # Service-reported timings can start before the first event of the step; keep children inside it
+        phase.start_ns = min(phase.start_ns, span.start_ns)
+        phase.end_ns = max(phase.end_ns or span.end_ns, span.end_ns)
+        self.root.start_ns = min(self.root.start_ns, phase.start_ns)
+        usage = metadata.get('usage', {})
+        if usage:
+            span.attributes['gen_ai.usage.input_tokens'] = usage.get('inputTokens', 0)
+            span.attributes['gen_ai.usage.output_tokens'] = usage.get('outputTokens', 0)
+        return span
+
+    def _handle(self, phase, kind, body, now):
+        if kind == 'modelInvocationInput':
+            span = self._open(phase, 'model', 'model invocation', now)
+            span.attributes['model.input_type'] = body.get('type', '')
+        elif kind == 'modelInvocationOutput':
+            self._close(phase, 'model', 'model invocation', now, body.get('metadata', {}))
+        elif kind == 'invocationInput':
+            invocation_type = body.get('invocationType', 'UNKNOWN')
+            if 'actionGroupInvocationInput' in body:
+                action = body['actionGroupInvocationInput']
+                name = f"action group {action.get('actionGroupName', '')}"
+                target = action.get('function') or action.get('apiPath')
+                span = self._open(phase, 'invocation', name, now)
+                if target:
+                    span.attributes['action_group.target'] = target
+            elif 'knowledgeBaseLookupInput' in body:
+                kb_id = body['knowledgeBaseLookupInput'].get('knowledgeBaseId', '')
+                self._open(phase, 'invocation', f"knowledge base {kb_id}", now)
+            else:
+                self._open(phase, 'invocation', invocation_type.lower(), now)
+        elif kind == 'observation':
+            metadata = {}
+            for output_key in ('actionGroupInvocationOutput', 'knowledgeBaseLookupOutput', 'finalResponse'):
+                if output_key in body:
+                    metadata = body[output_key].get('metadata', {}) or {}
+            if (phase.span_id, 'invocation') in self.open_spans or body.get('type') != 'FINISH':
+                self._close(phase, 'invocation', body.get('type', 'observation').lower(), now, metadata)
+            if 'finalResponse' in body:
+                span = Span('final response', now, phase)
+                span.end_ns = now
+        elif kind == 'rationale':
+            phase.attributes['rationale'] = body.get('text', '')[:200]
+
+    def spans(self):
+        """All spans in depth-first start-time order."""
+        return [span for _, span in self.root.walk()]
+
+    def to_otel(self):
+        """Export spans as an OTLP/JSON ExportTraceServiceRequest document."""
+        def attributes(values):
+            result = []
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    result.append({'key': key, 'value': {'boolValue': value}})
+                elif isinstance(value, int):
+                    result.append({'key': key, 'value': {'intValue': str(value)}})
+                else:
+                    result.append({'key': key, 'value': {'stringValue': str(value)}})
+            return result
+
+        otel_spans = []
+        for span in self.spans():
+            otel_spans.append({
+                'traceId': self.trace_id,
+                'spanId': span.span_id,
+                'parentSpanId': span.parent.span_id if span.parent else '',
+                'name': span.name,
+                'kind': 1,
+                'startTimeUnixNano': str(span.start_ns),
+                'endTimeUnixNano': str(span.end_ns if span.end_ns is not None else span.start_ns),
+                'attributes': attributes(span.attributes)
+            })
+
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': attributes({'service.name': 'bedrock-agent'})},
+                'scopeSpans': [{'scope': {'name': 'trace_collector'}, 'spans': otel_spans}]
+            }]
+        }
+
+    def summary(self, width=40):
+        """Flamegraph-style text view: one line per span with duration and a proportional bar."""
+        total = max(self.root.duration_ms(), 1e-6)
+        lines = []
+        for depth, span in self.root.walk():
+            label = ('  ' * depth + span.name)[:48]
+            offset = int((span.start_ns - self.root.start_ns) / 1e6 / total * width)
+            length = max(1, int(span.duration_ms() / total * width))
+            bar = ' ' * min(offset, width - 1) + '█' * min(length, width - offset)
+            lines.append(f"{label:<48} {span.duration_ms():>9.0f}ms |{bar:<{width}}|")
+        return '\n'.join(lines)
+
+    def save(self, directory):
+        """Write the OTLP JSON and text summary to directory; returns the JSON path."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"trace-{self.trace_id}")
+        with open(f"{base}.json", 'w') as f:
+            json.dump(self.to_otel(), f, indent=2)
+        with open(f"{base}.txt", 'w') as f:
+            f.write(self.summary() + '\n')
+        return f"{base}.json"
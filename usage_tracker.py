@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Per-invocation token and latency accounting for Bedrock agents.
+invoke_agent callers feed trace events into InvocationUsage and call record_usage(),
+also for invocations that raise (with usage.error set);
+totals are aggregated per agent, alias, prompt class and day in a local SQLite file.
+Run this script to report the most expensive and slowest prompts.
+"""
+
+import argparse
+import hashlib
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+from agent_config import AGENT_CONFIG
+
+USAGE_DB = 'agent_usage.db'
+
+# USD per 1K tokens (input, output)
+MODEL_PRICES = {
+    'anthropic.claude-3-sonnet-20240229-v1:0': (0.003, 0.015),
+    'anthropic.claude-3-haiku-20240307-v1:0': (0.00025, 0.00125),
+    'anthropic.claude-3-5-sonnet-20240620-v1:0': (0.003, 0.015),
+    'anthropic.claude-3-opus-20240229-v1:0': (0.015, 0.075),
+}
+
+TRACE_PARTS = ('preProcessingTrace', 'orchestrationTrace', 'postProcessingTrace')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS usage (
+    day TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    alias_id TEXT NOT NULL,
+    prompt_class TEXT NOT NULL,
+    invocations INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    model_calls INTEGER NOT NULL DEFAULT 0,
+    model_latency_ms INTEGER NOT NULL DEFAULT 0,
+    orchestration_steps INTEGER NOT NULL DEFAULT 0,
+    total_latency_ms INTEGER NOT NULL DEFAULT 0,
+    max_latency_ms INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, agent_id, alias_id, prompt_class)
+);
+CREATE TABLE IF NOT EXISTS prompt_classes (
+    prompt_class TEXT PRIMARY KEY,
+    sample TEXT NOT NULL
+);
+'''
+
+class InvocationUsage:
+    """Accumulates usage metadata from the trace events of one invoke_agent stream."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.model_calls = 0
+        self.model_latency_ms = 0
+        self.orchestration_steps = 0
+        self.foundation_model = None
+        self.error = False
+
+    def add_trace(self, event):
+        """Consume one 'trace' event from the completion stream."""
+        trace = event.get('trace', {})
+        for part in TRACE_PARTS:
+            step = trace.get(part)
+            if not step:
+                continue
+
+            if 'modelInvocationInput' in step:
+                model_input = step['modelInvocationInput']
+                self.foundation_model = model_input.get('foundationModel') or self.foundation_model
+                if part == 'orchestrationTrace':
+                    self.orchestration_steps += 1
+
+            output = step.get('modelInvocationOutput')
+            if output:
+                metadata = output.get('metadata', {})
+                usage = metadata.get('usage', {})
+                self.input_tokens += usage.get('inputTokens', 0)
+                self.output_tokens += usage.get('outputTokens', 0)
+                self.model_calls += 1
+                self.model_latency_ms += metadata.get('totalTimeMs', 0)
+
+        if 'failureTrace' in trace:
+            self.error = True
+
+    def elapsed_ms(self):
+        return int((time.monotonic() - self.started) * 1000)
+
+def classify_prompt(prompt):
+    """
+    Map a prompt to a stable class by masking variable parts (S3 URIs, numbers, quoted text).
+    Returns (class id, normalized text).
+    """
+    normalized = prompt.strip().lower()
+    normalized = re.sub(r's3://\S+', '<uri>', normalized)
+    normalized = re.sub(r'"[^"]*"|\'[^\']*\'', '<text>', normalized)
+    normalized = re.sub(r'\d+(\.\d+)?', '<n>', normalized)
+    normalized = re.sub(r'\s+', ' ', normalized)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12], normalized
+
+def estimate_cost(model, input_tokens, output_tokens):
+    """Estimated USD cost of the given token counts."""
+    input_price, output_price = MODEL_PRICES.get(model, MODEL_PRICES[AGENT_CONFIG['foundation_model']])
+    return input_tokens / 1000 * input_price + output_tokens / 1000 * output_price
+
+def connect(path=USAGE_DB):
+    """Open the usage store, creating tables on first use."""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+def record_usage(agent_id, alias_id, prompt, usage, path=USAGE_DB):
+    """Add one invocation's usage to the daily aggregate."""
+    prompt_class, normalized = classify_prompt(prompt)
+    model = usage.foundation_model or AGENT_CONFIG['foundation_model']
+    cost = estimate_cost(model, usage.input_tokens, usage.output_tokens)
+    latency = usage.elapsed_ms()
+    day = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    conn = connect(path)
+    with conn:
+        conn.execute(
+            'INSERT OR IGNORE INTO prompt_classes (prompt_class, sample) VALUES (?, ?)',
+            (prompt_class, normalized[:200])
+        )
+        conn.execute('''
+            INSERT INTO usage (day, agent_id, alias_id, prompt_class, invocations, errors,
+                               input_tokens, output_tokens, model_calls, model_latency_ms,
+                               orchestration_steps, total_latency_ms, max_latency_ms, cost_usd)
+            VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (day, agent_id, alias_id, prompt_class) DO UPDATE SET
+                invocations = invocations + 1,
+                errors = errors + excluded.errors,
+                input_tokens = input_tokens + excluded.input_tokens,
+                output_tokens = output_tokens + excluded.output_tokens,
+                model_calls = model_calls + excluded.model_calls,
+                model_latency_ms = model_latency_ms + excluded.model_latency_ms,
+                orchestration_steps = orchestration_steps + excluded.orchestration_steps,
+                total_latency_ms = total_latency_ms + excluded.total_latency_ms,
+                max_latency_ms = MAX(max_latency_ms, excluded.max_latency_ms),
+                cost_usd = cost_usd + excluded.cost_usd
+        ''', (day, agent_id, alias_id, prompt_class, int(usage.error),
+              usage.input_tokens, usage.output_tokens, usage.model_calls, usage.model_latency_ms,
+              usage.orchestration_steps, latency, latency, cost))
+    conn.close()
+
+def report(days, order, limit, path=USAGE_DB):
+    """Print the top prompt classes over the last N days."""
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d')
+    order_by = {
+        'cost': 'cost DESC',
+        'latency': 'avg_latency DESC',
+        'tokens': 'tokens DESC'
+    }[order]
+
+    conn = connect(path)
+    rows = conn.execute(f'''
+        SELECT u.agent_id, u.alias_id, u.prompt_class, p.sample,
+               SUM(u.invocations), SUM(u.errors),
+               SUM(u.input_tokens) + SUM(u.output_tokens) AS tokens,
+               SUM(u.cost_usd) AS cost,
+               SUM(u.total_latency_ms) * 1.0 / SUM(u.invocations) AS avg_latency,
+               MAX(u.max_latency_ms),
+               SUM(u.orchestration_steps) * 1.0 / SUM(u.invocations)
+        FROM usage u JOIN prompt_classes p ON p.prompt_class = u.prompt_class
+        WHERE u.day >= ?
+        GROUP BY u.agent_id, u.alias_id, u.prompt_class
+        ORDER BY {order_by}
+        LIMIT ?
+    ''', (since, limit)).fetchall()
+    totals = conn.execute(
+        'SELECT SUM(invocations), SUM(input_tokens), SUM(output_tokens), SUM(cost_usd) FROM usage WHERE day >= ?',
+        (since,)
+    ).fetchone()
+    conn.close()
+
+    print("=" * 60)
+    print(f"Agent Usage Report (last {days} day(s), by {order})")
+    print("=" * 60)
+    if not rows:
+        print("No usage recorded yet. Run test_agent.py to collect some.")
+        return
+
+    for agent_id, alias_id, _, sample, calls, errors, tokens, cost, avg_latency, max_latency, steps in rows:
+        print(f"\n{agent_id}/{alias_id}  {sample[:70]}")
+        print(f"   calls {calls} (errors {errors})  tokens {tokens}  cost ${cost:.4f}")
+        print(f"   latency avg {avg_latency:.0f}ms max {max_latency}ms  steps/call {steps:.1f}")
+
+    invocations, input_tokens, output_tokens, cost = totals
+    print("\n" + "-" * 60)
+    print(f"Total: {invocations} invocation(s), {input_tokens} input / {output_tokens} output tokens, ${cost:.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Report agent token usage, cost and latency.')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--by', choices=['cost', 'latency', 'tokens'], default='cost')
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    report(args.days, args.by, args.limit)
+
+if __name__ == '__main__':
+    main()